@@ -8,3 +8,4 @@ class ArticleAdmin(admin.ModelAdmin):
     list_display = ('title', 'view_count', 'publish_date',)
     search_fields = ('title', 'body',)
     ordering = ('-publish_date',)
+    readonly_fields = ('image_hash', 'image_thumbnail', 'image_full', 'image_webp',)
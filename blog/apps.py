@@ -5,3 +5,6 @@ class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
     verbose_name = 'блог'
+
+    def ready(self) -> None:
+        import blog.signals  # noqa: F401
@@ -0,0 +1,16 @@
+from blog.services import article_views, build_missing_article_images
+
+
+def cron_build_article_images() -> None:
+    '''
+    Функция создает производные изображения статей, которые не обработал
+    фоновый поток (например, из-за перезапуска процесса)
+    '''
+    build_missing_article_images()
+
+
+def cron_flush_article_views() -> None:
+    '''
+    Функция переносит просмотры статей, накопленные в кэше, в базу данных
+    '''
+    article_views.flush()
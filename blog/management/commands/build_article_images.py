@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+
+from blog.services import build_missing_article_images
+
+
+class Command(BaseCommand):
+    '''
+    Команда для создания производных изображений статей блога
+    (миниатюра, полноразмерное изображение и WebP)
+    '''
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--force', action='store_true',
+                            help='Создать производные заново для всех статей')
+
+    def handle(self, *args, **options) -> None:
+        built = build_missing_article_images(options['force'])
+        self.stdout.write(f'Обработано статей: {built}')
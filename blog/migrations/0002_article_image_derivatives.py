@@ -0,0 +1,33 @@
+# Generated by Django 4.2.4 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='image_full',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='blog/derivatives/', verbose_name='Полноразмерное изображение'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Хэш изображения'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='blog/derivatives/', verbose_name='Миниатюра'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='image_webp',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='blog/derivatives/', verbose_name='Изображение WebP'),
+        ),
+    ]
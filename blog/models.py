@@ -1,17 +1,29 @@
 from django.db import models
 
-from mailings.models import NULLABLE
+import hashlib
 
-from PIL import Image
+from mailings.models import NULLABLE
 
 
 class Article(models.Model):
     '''
-    Модель статьи блога
+    Модель статьи блога. Изображение статьи сохраняется как есть, его
+    производные (миниатюра для списков, полноразмерное изображение и WebP)
+    создаются фоновым обработчиком один раз для каждого содержимого
+    изображения, которое определяется по хэшу
     '''
+    IMAGE_VARIANTS = ('thumbnail', 'full', 'webp')
+
     title = models.CharField(max_length=100, verbose_name='Заголовок')
     body = models.TextField('Содержимое')
     image = models.ImageField(upload_to='blog/', verbose_name='Изображение')
+    image_hash = models.CharField(max_length=64, blank=True, editable=False, verbose_name='Хэш изображения')
+    image_thumbnail = models.ImageField(upload_to='blog/derivatives/', editable=False, verbose_name='Миниатюра',
+                                        **NULLABLE)
+    image_full = models.ImageField(upload_to='blog/derivatives/', editable=False,
+                                   verbose_name='Полноразмерное изображение', **NULLABLE)
+    image_webp = models.ImageField(upload_to='blog/derivatives/', editable=False, verbose_name='Изображение WebP',
+                                   **NULLABLE)
     view_count = models.PositiveIntegerField(verbose_name='Кол-во просмотров', default=0, **NULLABLE)
     publish_date = models.DateTimeField(auto_now_add=True, auto_now=False, verbose_name='Дата публикации', **NULLABLE)
 
@@ -19,15 +31,35 @@ class Article(models.Model):
         return f'{self.title}'
 
     def save(self, *args, **kwargs) -> None:
+        # хэш считается только для нового загруженного файла, Pillow при сохранении не используется
+        self.image_changed = bool(self.image) and not self.image._committed
+
+        if self.image_changed:
+            image_hash = hashlib.sha256()
+
+            for chunk in self.image.chunks():
+                image_hash.update(chunk)
+
+            self.image.seek(0)
+            self.image_changed = image_hash.hexdigest() != self.image_hash
+
+            # производные изображения с другим содержимым больше не подходят
+            if self.image_changed:
+                self.image_hash = image_hash.hexdigest()
+                self.image_thumbnail = self.image_full = self.image_webp = None
+
         super().save(*args, **kwargs)
 
-        img = Image.open(self.image.path)
-        max_size = (1200, 800)
+    def get_image(self, variant: str = None) -> models.fields.files.FieldFile:
+        '''
+        Возвращает производное изображение статьи, а если оно еще
+        не создано - исходное изображение
+        :param variant: вариант изображения из IMAGE_VARIANTS
+        :return: файл изображения
+        '''
+        image = getattr(self, f'image_{variant}', None) if variant in self.IMAGE_VARIANTS else None
 
-        # сжимает изображения до 1200x800
-        if img.width != max_size[0] or img.height != max_size[1]:
-            resized_image = img.resize(max_size)
-            resized_image.save(self.image.path)
+        return image or self.image
 
     class Meta:
         verbose_name = 'Статья'
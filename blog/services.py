@@ -0,0 +1,469 @@
+from blog.models import Article
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Coalesce, Left
+
+import hashlib
+import io
+import queue
+import random
+import threading
+import time
+
+from collections import Counter
+from typing import Iterable
+
+from mailings.cache import VersionedCache
+from mailings.services.utils import iter_batches
+
+from PIL import Image
+
+# поля статьи для списков в порядке полей модели, в кэше хранятся кортежи их значений
+ARTICLE_LIST_FIELDS = ('id', 'title', 'body', 'image', 'image_thumbnail', 'publish_date')
+# список статей показывает только начало текста (body|slice:"500" в шаблоне)
+ARTICLE_PREVIEW_LENGTH = 500
+
+articles_cache = VersionedCache('articles', settings.ARTICLES_CACHE_TTL)
+
+
+def get_article_rows() -> list[tuple]:
+    '''
+    Функция возвращает значения полей ARTICLE_LIST_FIELDS всех статей,
+    текст статьи обрезается базой данных до ARTICLE_PREVIEW_LENGTH символов
+    :return: список кортежей значений полей статей
+    '''
+    fields = [Left('body', ARTICLE_PREVIEW_LENGTH) if field == 'body' else field for field in ARTICLE_LIST_FIELDS]
+
+    return list(Article.objects.order_by('pk').values_list(*fields))
+
+
+def get_articles_from_cache() -> list[Article]:
+    '''
+    Функция возвращает все статьи из кэша. Если кэш пуст, то сохраняет
+    в него значения полей статей из базы данных. Кэш сбрасывается
+    сигналами при изменении статей
+    :return: список статей с полями ARTICLE_LIST_FIELDS
+    '''
+    rows = articles_cache.get_or_set('list', get_article_rows)
+
+    return [Article.from_db(None, ARTICLE_LIST_FIELDS, row) for row in rows]
+
+
+def get_article_pks() -> list[int]:
+    '''
+    Функция возвращает первичные ключи всех статей
+    :return: список первичных ключей
+    '''
+    return list(Article.objects.values_list('pk', flat=True))
+
+
+def get_random_articles(count: int) -> list[Article]:
+    '''
+    Функция возвращает count случайных статей блога. Первичные ключи статей
+    берутся из кэша статей, из базы данных выбираются только сами выбранные
+    статьи
+    :param count: количество статей
+    :return: список статей или пустой список, если статей меньше count
+    '''
+    pks = articles_cache.get_or_set('pks', get_article_pks)
+
+    if len(pks) < count:
+        return []
+
+    return list(Article.objects.filter(pk__in=random.sample(pks, count)))
+
+
+# производные изображения статей: размер, формат и расширение файла
+ARTICLE_IMAGE_DERIVATIVES = {
+    'thumbnail': ((400, 267), 'JPEG', 'jpg'),
+    'full': ((1200, 800), 'JPEG', 'jpg'),
+    'webp': ((1200, 800), 'WEBP', 'webp'),
+}
+ARTICLE_IMAGE_DIR = 'blog/derivatives'
+# размер блока чтения исходного изображения при подсчете хэша
+ARTICLE_IMAGE_READ_SIZE = 64 * 1024
+
+
+def get_article_image_names(image_hash: str) -> dict[str, str]:
+    '''
+    Функция возвращает имена файлов производных изображений по хэшу
+    исходного изображения. Одинаковые изображения разных статей
+    используют одни и те же производные
+    :param image_hash: хэш содержимого исходного изображения
+    :return: словарь вариант изображения - имя файла
+    '''
+    return {
+        variant: f'{ARTICLE_IMAGE_DIR}/{image_hash}_{variant}.{extension}'
+        for variant, (_, _, extension) in ARTICLE_IMAGE_DERIVATIVES.items()
+    }
+
+
+def build_article_images(article: Article, force: bool = False) -> bool:
+    '''
+    Функция создает производные изображения статьи и сохраняет их имена
+    в статье. Изображение декодируется, только если каких-то производных
+    для его содержимого еще нет в хранилище
+    :param article: статья блога
+    :param force: создать производные заново, даже если они уже есть
+    :return: True, если производные статьи изменились
+    '''
+    storage = article.image.storage
+
+    with storage.open(article.image.name, 'rb') as file:
+        image_hash = hashlib.sha256()
+
+        for chunk in iter(lambda: file.read(ARTICLE_IMAGE_READ_SIZE), b''):
+            image_hash.update(chunk)
+
+        image_hash = image_hash.hexdigest()
+        names = get_article_image_names(image_hash)
+        current = {variant: getattr(article, f'image_{variant}').name for variant in names}
+
+        if not force and image_hash == article.image_hash and current == names:
+            return False
+
+        missing = [variant for variant, name in names.items() if force or not storage.exists(name)]
+
+        if missing:
+            file.seek(0)
+
+            with Image.open(file) as image:
+                image = image.convert('RGB')
+
+                for variant in missing:
+                    size, image_format, _ = ARTICLE_IMAGE_DERIVATIVES[variant]
+                    buffer = io.BytesIO()
+                    image.resize(size).save(buffer, image_format, quality=85)
+
+                    if storage.exists(names[variant]):
+                        storage.delete(names[variant])
+
+                    storage.save(names[variant], ContentFile(buffer.getvalue()))
+
+    # статья не обновляется, если её изображение заменили во время обработки
+    updated = Article.objects.filter(pk=article.pk, image=article.image.name).update(
+        image_hash=image_hash, **{f'image_{variant}': name for variant, name in names.items()}
+    )
+
+    if updated:
+        articles_cache.bump()
+
+    return bool(updated)
+
+
+def build_missing_article_images(force: bool = False) -> int:
+    '''
+    Функция создает производные изображения статей, у которых их еще нет
+    :param force: создать производные заново для всех статей
+    :return: количество обновленных статей
+    '''
+    articles = Article.objects.all()
+
+    if not force:
+        articles = articles.filter(
+            Q(image_thumbnail='') | Q(image_thumbnail__isnull=True) | Q(image_full='') | Q(image_full__isnull=True)
+            | Q(image_webp='') | Q(image_webp__isnull=True)
+        )
+
+    built = 0
+
+    for article in articles.only(
+        'image', 'image_hash', 'image_thumbnail', 'image_full', 'image_webp'
+    ).iterator(chunk_size=100):
+        try:
+            built += build_article_images(article, force)
+        except Exception as e:
+            print(f'Ошибка обработки изображения статьи {article.pk} - {e}')
+
+    return built
+
+
+class ArticleImageWorker:
+    '''
+    Фоновый поток создания производных изображений статей. Статья ставится
+    в очередь после сохранения нового изображения, поток запускается при
+    первой задаче и обрабатывает статьи по одной со своим соединением с базой
+    данных. Статьи, задачи которых потерялись при перезапуске процесса,
+    обрабатывает cron_build_article_images
+    '''
+
+    def __init__(self) -> None:
+        self.__tasks = queue.Queue()
+        self.__lock = threading.Lock()
+        self.__thread = None
+
+    def __work(self) -> None:
+        while True:
+            article_pk = self.__tasks.get()
+
+            try:
+                article = Article.objects.filter(pk=article_pk).first()
+
+                if article is not None:
+                    build_article_images(article)
+            except Exception as e:
+                print(f'Ошибка обработки изображения статьи {article_pk} - {e}')
+            finally:
+                connections.close_all()
+                self.__tasks.task_done()
+
+    def put(self, article_pk: int) -> None:
+        '''
+        Ставит статью в очередь обработки
+        :param article_pk: первичный ключ статьи
+        '''
+        self.__tasks.put(article_pk)
+
+        with self.__lock:
+            if self.__thread is None or not self.__thread.is_alive():
+                self.__thread = threading.Thread(target=self.__work, name='article-images', daemon=True)
+                self.__thread.start()
+
+    def join(self) -> None:
+        '''
+        Ожидает обработки всех статей в очереди
+        '''
+        self.__tasks.join()
+
+
+article_image_worker = ArticleImageWorker()
+
+
+def enqueue_article_images(article_pk: int) -> None:
+    '''
+    Функция ставит статью в очередь фонового создания производных
+    изображений. Если фоновая обработка выключена, производные создаст
+    cron_build_article_images
+    :param article_pk: первичный ключ статьи
+    '''
+    if settings.ARTICLE_IMAGES_ASYNC:
+        article_image_worker.put(article_pk)
+
+
+class ArticleViewCounter:
+    '''
+    Буферизованный счетчик просмотров статей. Просмотр увеличивает счетчик
+    в кэше (cache.incr) или, если кэш выключен, в памяти процесса и не
+    пишет в базу данных. Накопленные просмотры переносятся в
+    Article.view_count одним UPDATE с F-выражением: из кэша - задачей
+    cron_flush_article_views, из памяти процесса - запросом, который
+    учитывает просмотр, не чаще, чем раз в ARTICLE_VIEWS_FLUSH_INTERVAL
+    секунд. Просмотры из памяти процесса, не перенесенные до его
+    завершения, теряются.
+
+    Статьи с непереданными просмотрами записываются в журнал в кэше:
+    просмотр, после которого счетчик статьи стал равен 1, добавляет запись
+    с первичным ключом статьи под следующим номером. Перенос читает только
+    записи журнала после последней перенесенной
+    '''
+    flush_lock_key = 'article_views_flush'
+    journal_last_key = 'article_views_journal_last'
+    journal_done_key = 'article_views_journal_done'
+    # блокировка снимается сама, только если процесс переноса завис или упал
+    flush_lock_timeout = 3600
+
+    def __init__(self) -> None:
+        self.__pending = Counter()
+        self.__lock = threading.Lock()
+        self.__flushed_at = time.monotonic()
+
+    @staticmethod
+    def get_cache_key(article_pk: int) -> str:
+        '''
+        Возвращает ключ кэша непереданных просмотров статьи
+        :param article_pk: первичный ключ статьи
+        :return: ключ кэша
+        '''
+        return f'article_views_{article_pk}'
+
+    @staticmethod
+    def get_journal_key(num: int) -> str:
+        '''
+        Возвращает ключ кэша записи журнала статей с непереданными просмотрами
+        :param num: номер записи
+        :return: ключ кэша
+        '''
+        return f'article_views_journal_{num}'
+
+    def __mark(self, article_pk: int) -> None:
+        cache.add(self.journal_last_key, 0, timeout=None)
+        num = cache.incr(self.journal_last_key)
+        cache.set(self.get_journal_key(num), article_pk, timeout=None)
+
+    def incr(self, article_pk: int) -> None:
+        '''
+        Учитывает один просмотр статьи
+        :param article_pk: первичный ключ статьи
+        '''
+        if settings.CACHE_ENABLED:
+            key = self.get_cache_key(article_pk)
+
+            try:
+                count = cache.incr(key)
+            except ValueError:
+                # первый просмотр статьи - ключа еще нет
+                cache.add(key, 0, timeout=None)
+                count = cache.incr(key)
+
+            if count == 1:
+                self.__mark(article_pk)
+
+            return
+
+        with self.__lock:
+            self.__pending[article_pk] += 1
+            due = time.monotonic() - self.__flushed_at >= settings.ARTICLE_VIEWS_FLUSH_INTERVAL
+
+        if due:
+            self.flush()
+
+    def get_pending(self, article_pks: Iterable[int]) -> dict[int, int]:
+        '''
+        Возвращает непереданные в базу данных просмотры статей
+        :param article_pks: первичные ключи статей
+        :return: словарь первичный ключ статьи - количество просмотров
+        '''
+        if settings.CACHE_ENABLED:
+            keys = {self.get_cache_key(pk): pk for pk in article_pks}
+
+            return {keys[key]: int(count) for key, count in cache.get_many(keys).items() if count}
+
+        with self.__lock:
+            return {pk: self.__pending[pk] for pk in article_pks if self.__pending.get(pk)}
+
+    def merge(self, articles: Iterable[Article]) -> None:
+        '''
+        Добавляет к view_count статей их непереданные просмотры,
+        статьи в базе данных не изменяются
+        :param articles: статьи блога
+        '''
+        articles = list(articles)
+        pending = self.get_pending(article.pk for article in articles)
+
+        for article in articles:
+            article.view_count = (article.view_count or 0) + pending.get(article.pk, 0)
+
+    @staticmethod
+    def __write(deltas: dict[int, int]) -> None:
+        Article.objects.filter(pk__in=deltas).update(
+            view_count=Coalesce(F('view_count'), 0) + Case(
+                *(When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()), default=Value(0)
+            )
+        )
+
+    def __read_journal(self, nums: list[int]) -> tuple[list[str], set[int]]:
+        keys = [self.get_journal_key(num) for num in nums]
+        entries = cache.get_many(keys)
+        done = []
+
+        for key in keys:
+            # номер записи выдан, но статья еще не сохранена - запись ждет до следующего переноса,
+            # и только потом считается потерянной (процесс упал между cache.incr и cache.set)
+            if key not in entries and cache.add(f'{key}_missing', 1, self.flush_lock_timeout):
+                break
+
+            done.append(key)
+
+        return done, {int(entries[key]) for key in done if key in entries}
+
+    def __take(self, article_pks: Iterable[int]) -> dict[int, int]:
+        # счетчик уменьшается на прочитанное значение до UPDATE, поэтому повторный перенос после сбоя
+        # не учтет эти просмотры второй раз, а просмотры, учтенные во время переноса, остаются в счетчике
+        keys = {self.get_cache_key(pk): pk for pk in article_pks}
+        deltas = {}
+
+        for key, count in cache.get_many(keys).items():
+            if not count or int(count) <= 0:
+                continue
+
+            pk = keys[key]
+            deltas[pk] = int(count)
+
+            if cache.decr(key, deltas[pk]) > 0:
+                # счетчик статьи уже больше 1, поэтому просмотр во время переноса не добавил запись в журнал
+                self.__mark(pk)
+
+        return deltas
+
+    def __restore(self, deltas: dict[int, int]) -> None:
+        # записи журнала порции остаются непереданными, поэтому статьи снова попадут в следующий перенос
+        for pk, delta in deltas.items():
+            cache.incr(self.get_cache_key(pk), delta)
+
+    def flush(self, chunk_size: int = 500) -> int:
+        '''
+        Переносит накопленные просмотры в базу данных. Из кэша переносятся
+        только статьи из записей журнала после последней перенесенной, их
+        счетчики уменьшаются до UPDATE и восстанавливаются, если UPDATE не
+        выполнен. Одновременно перенос выполняет один процесс
+        :param chunk_size: количество записей журнала в одном UPDATE
+        :return: количество перенесенных просмотров
+        '''
+        flushed = 0
+
+        try:
+            if not settings.CACHE_ENABLED:
+                with self.__lock:
+                    deltas, self.__pending = dict(self.__pending), Counter()
+                    self.__flushed_at = time.monotonic()
+
+                try:
+                    for pks in iter_batches(list(deltas), chunk_size):
+                        self.__write({pk: deltas[pk] for pk in pks})
+                        flushed += sum(deltas.pop(pk) for pk in pks)
+                finally:
+                    # непереданные просмотры возвращаются в счетчик
+                    with self.__lock:
+                        self.__pending.update(deltas)
+
+                return flushed
+
+            if not cache.add(self.flush_lock_key, 1, self.flush_lock_timeout):
+                return flushed
+
+            try:
+                first = cache.get(self.journal_done_key, 0) + 1
+                last = cache.get(self.journal_last_key, 0)
+
+                for nums in iter_batches(range(first, last + 1), chunk_size):
+                    keys, pks = self.__read_journal(nums)
+                    deltas = self.__take(pks)
+
+                    if deltas:
+                        try:
+                            self.__write(deltas)
+                        except Exception:
+                            self.__restore(deltas)
+                            raise
+
+                        flushed += sum(deltas.values())
+
+                    if keys:
+                        cache.set(self.journal_done_key, nums[len(keys) - 1], timeout=None)
+                        cache.delete_many(keys + [f'{key}_missing' for key in keys])
+
+                    if len(keys) < len(nums):
+                        break
+            finally:
+                cache.delete(self.flush_lock_key)
+        except Exception as e:
+            print(f'Ошибка переноса просмотров статей - {e}')
+
+        return flushed
+
+    def discard(self) -> None:
+        '''
+        Удаляет непереданные просмотры из памяти процесса без записи в базу
+        данных. Вызывается перед удалением тестовой базы данных, чтобы
+        просмотры из тестов не попали в рабочую
+        '''
+        with self.__lock:
+            self.__pending = Counter()
+            self.__flushed_at = time.monotonic()
+
+
+article_views = ArticleViewCounter()
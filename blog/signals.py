@@ -0,0 +1,28 @@
+from functools import partial
+
+from blog.models import Article
+from blog.services import articles_cache, enqueue_article_images
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+
+@receiver(post_save, sender=Article)
+def build_article_images_on_change(sender, instance: Article, **kwargs) -> None:
+    '''
+    Ставит статью в очередь создания производных изображений после сохранения
+    нового изображения. Сохранения статьи без смены изображения пропускаются
+    '''
+    if getattr(instance, 'image_changed', False):
+        transaction.on_commit(partial(enqueue_article_images, instance.pk))
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def reset_articles_cache(sender, **kwargs) -> None:
+    '''
+    Сбрасывает кэш статей при их изменении после фиксации транзакции,
+    чтобы кэш не заполнился данными, которые еще не видны другим запросам
+    '''
+    transaction.on_commit(articles_cache.bump)
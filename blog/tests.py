@@ -1 +1,135 @@
-from django.test import TestCase
+from blog.models import Article
+from blog.services import ArticleViewCounter, articles_cache, get_articles_from_cache
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from unittest import mock
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'blog-tests'}}
+
+
+@override_settings(CACHE_ENABLED=True, CACHES=LOCMEM_CACHES)
+class ArticleViewCounterTestCase(TestCase):
+    '''
+    Тесты переноса просмотров статей из кэша в базу данных
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.first, cls.second = Article.objects.bulk_create([
+            Article(title='Первая', body='Текст', image='blog/first.jpg'),
+            Article(title='Вторая', body='Текст', image='blog/second.jpg'),
+        ])
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.counter = ArticleViewCounter()
+
+    def get_view_counts(self) -> dict[int, int]:
+        return dict(Article.objects.values_list('pk', 'view_count'))
+
+    def view(self, article: Article, times: int = 1) -> None:
+        for _ in range(times):
+            self.counter.incr(article.pk)
+
+    def test_views_are_flushed_once(self) -> None:
+        self.view(self.first, 3)
+        self.view(self.second)
+
+        self.assertEqual(self.counter.flush(), 4)
+        self.assertEqual(self.counter.flush(), 0)
+
+        self.assertEqual(self.get_view_counts(), {self.first.pk: 3, self.second.pk: 1})
+        self.assertEqual(self.counter.get_pending([self.first.pk, self.second.pk]), {})
+
+    def test_views_counted_during_flush_stay_pending(self) -> None:
+        self.view(self.first, 2)
+        write = ArticleViewCounter._ArticleViewCounter__write
+
+        def write_after_view(deltas: dict[int, int]) -> None:
+            self.view(self.first)
+            write(deltas)
+
+        with mock.patch.object(ArticleViewCounter, '_ArticleViewCounter__write', side_effect=write_after_view):
+            self.assertEqual(self.counter.flush(), 2)
+
+        self.assertEqual(self.counter.get_pending([self.first.pk]), {self.first.pk: 1})
+        self.assertEqual(self.counter.flush(), 1)
+        self.assertEqual(self.get_view_counts()[self.first.pk], 3)
+
+    def test_view_between_read_and_decrement_is_flushed_later(self) -> None:
+        self.view(self.first, 2)
+        get_many = cache.get_many
+        counter_key = ArticleViewCounter.get_cache_key(self.first.pk)
+
+        def get_many_before_view(keys):
+            values = get_many(keys)
+
+            # просмотр учтен после чтения счетчика, но до его уменьшения
+            if counter_key in keys:
+                self.view(self.first)
+
+            return values
+
+        with mock.patch.object(cache, 'get_many', side_effect=get_many_before_view):
+            self.assertEqual(self.counter.flush(), 2)
+
+        self.assertEqual(self.counter.flush(), 1)
+        self.assertEqual(self.get_view_counts()[self.first.pk], 3)
+
+    def test_failed_update_restores_views(self) -> None:
+        self.view(self.first, 2)
+
+        with mock.patch.object(ArticleViewCounter, '_ArticleViewCounter__write', side_effect=RuntimeError('db down')):
+            self.assertEqual(self.counter.flush(), 0)
+
+        self.assertEqual(self.counter.get_pending([self.first.pk]), {self.first.pk: 2})
+        self.assertEqual(self.counter.flush(), 2)
+        self.assertEqual(self.get_view_counts()[self.first.pk], 2)
+
+    def test_lost_journal_entry_is_skipped_on_next_flush(self) -> None:
+        self.view(self.first)
+        # номер записи журнала выдан, но процесс упал до сохранения статьи
+        cache.incr(ArticleViewCounter.journal_last_key)
+        self.view(self.second)
+
+        self.assertEqual(self.counter.flush(), 1)
+        self.assertEqual(self.counter.flush(), 1)
+
+        self.assertEqual(self.get_view_counts(), {self.first.pk: 1, self.second.pk: 1})
+
+    @override_settings(CACHE_ENABLED=False, ARTICLE_VIEWS_FLUSH_INTERVAL=3600)
+    def test_discard_drops_views_kept_in_process(self) -> None:
+        self.view(self.first, 2)
+
+        self.counter.discard()
+
+        self.assertEqual(self.counter.get_pending([self.first.pk]), {})
+        self.assertEqual(self.counter.flush(), 0)
+        self.assertEqual(self.get_view_counts()[self.first.pk], 0)
+
+
+@override_settings(CACHE_ENABLED=True, CACHES=LOCMEM_CACHES)
+class ArticlesCacheTestCase(TestCase):
+    '''
+    Тесты сброса кэша списка статей при их изменении
+    '''
+
+    def setUp(self) -> None:
+        cache.clear()
+        articles_cache.clear()
+
+    def test_cache_is_reset_after_commit(self) -> None:
+        Article.objects.create(title='Первая', body='Текст', image='blog/first.jpg')
+        version = articles_cache.get_version()
+        self.assertEqual([article.title for article in get_articles_from_cache()], ['Первая'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.objects.create(title='Вторая', body='Текст', image='blog/second.jpg')
+
+            # до фиксации транзакции другие запросы не видят новую статью - кэш не сбрасывается
+            self.assertEqual(articles_cache.get_version(), version)
+
+        self.assertGreater(articles_cache.get_version(), version)
+        self.assertEqual([article.title for article in get_articles_from_cache()], ['Первая', 'Вторая'])
@@ -1,27 +1,31 @@
 from blog.forms import ArticleForm
 from blog.models import Article
+from blog.services import article_views, articles_cache, get_articles_from_cache
 
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.db.models import QuerySet
 from django.urls import reverse_lazy
+from django.utils.functional import SimpleLazyObject
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 
-from mailings.services import get_articles_from_cache
+from mailings.mixins import ListCacheMixin
 
 from typing import Any
 
 
-class ArticleListView(ListView):
+class ArticleListView(ListCacheMixin, ListView):
     '''
     Класс для отображения всех статей блога
     '''
     model = Article
+    template_name = 'blog/article_list.html'
+    context_object_name = 'articles'
 
-    def get_queryset(self) -> QuerySet:
-        return get_articles_from_cache()
+    def get_fragment_version(self) -> int:
+        return articles_cache.get_version()
 
-    def get_context_data(self, **kwargs) -> dict[str, Any]:
-        context = super().get_context_data(**kwargs)
+    def get_context_data(self, *, object_list=None, **kwargs) -> dict[str, Any]:
+        # статьи читаются из кэша при первом обращении из фрагмента {% cache %}, то есть только при промахе кэша
+        context = super().get_context_data(object_list=SimpleLazyObject(get_articles_from_cache), **kwargs)
         context['title'] = 'Блог'
 
         return context
@@ -36,8 +40,9 @@ class ArticleDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView)
 
     def get_object(self, queryset=None) -> Article:
         self.object = super().get_object(queryset)
-        self.object.view_count += 1
-        self.object.save()
+        # просмотр учитывается в буферизованном счетчике без записи в базу данных
+        article_views.incr(self.object.pk)
+        article_views.merge([self.object])
 
         return self.object
 
@@ -57,24 +57,35 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'mailings.middleware.UserGroupsMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'mailing_service.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+# в production шаблоны компилируются один раз и хранятся в памяти процесса
+if not DEBUG:
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'mailings.context_processors.layout_cache',
             ],
+            'loaders': TEMPLATE_LOADERS,
         },
     },
 ]
@@ -95,6 +106,13 @@ DATABASES = {
     }
 }
 
+# локальный запуск и нагрузочные тесты без PostgreSQL
+if os.getenv('DATABASE_ENGINE') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / (os.getenv('DATABASE_NAME') or 'db.sqlite3'),
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -158,6 +176,10 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 SERVER_EMAIL = EMAIL_HOST_USER
 EMAIL_ADMIN = EMAIL_HOST_USER
 
+EMAIL_CONNECTION_POOL_SIZE = int(os.getenv('EMAIL_CONNECTION_POOL_SIZE', 4))
+EMAIL_MESSAGES_PER_CONNECTION = int(os.getenv('EMAIL_MESSAGES_PER_CONNECTION', 100))
+EMAIL_MAX_CONNECTION_ERRORS = int(os.getenv('EMAIL_MAX_CONNECTION_ERRORS', 5))
+
 # User settings
 AUTH_USER_MODEL = 'users.User'
 LOGIN_REDIRECT_URL = '/'
@@ -166,12 +188,43 @@ LOGIN_URL = 'users:login'
 
 # Crontab jobs
 CRONJOBS = [
-    ('*/1 * * * *', 'mailings.cron.cron_send_email')
+    ('*/1 * * * *', 'mailings.cron.cron_send_email'),
+    ('30 3 * * *', 'mailings.cron.cron_purge_deliveries'),
+    ('0 3 * * *', 'mailings.cron.cron_compact_logs'),
+    ('*/10 * * * *', 'blog.cron.cron_build_article_images'),
+    ('*/1 * * * *', 'blog.cron.cron_flush_article_views'),
 ]
 
+# Mailing dispatch settings
+MAILING_DISPATCH_BATCH_SIZE = int(os.getenv('MAILING_DISPATCH_BATCH_SIZE', 100))
+MAILING_DISPATCH_WORKERS = int(os.getenv('MAILING_DISPATCH_WORKERS', 4))
+MAILING_DISPATCH_PER_USER = int(os.getenv('MAILING_DISPATCH_PER_USER', 2))
+MAILING_LEASE_SECONDS = int(os.getenv('MAILING_LEASE_SECONDS', 600))
+MAILING_SEND_CHUNK_SIZE = int(os.getenv('MAILING_SEND_CHUNK_SIZE', 100))
+MAILING_LOGS_BATCH_SIZE = int(os.getenv('MAILING_LOGS_BATCH_SIZE', 500))
+MAILING_LOGS_FLUSH_INTERVAL = float(os.getenv('MAILING_LOGS_FLUSH_INTERVAL', 5))
+MAILING_DELIVERY_RETENTION_DAYS = int(os.getenv('MAILING_DELIVERY_RETENTION_DAYS', 90))
+MAILING_LOGS_RETENTION_DAYS = int(os.getenv('MAILING_LOGS_RETENTION_DAYS', 30))
+
+# Blog image settings
+ARTICLE_IMAGES_ASYNC = os.getenv('ARTICLE_IMAGES_ASYNC', 'True') == 'True'
+ARTICLE_VIEWS_FLUSH_INTERVAL = int(os.getenv('ARTICLE_VIEWS_FLUSH_INTERVAL', 60))
+
 # Cache settings
 CACHE_ENABLED = os.getenv('CACHE_ENABLED') == 'True'
 
+LOOKUP_CACHE_TTL = int(os.getenv('LOOKUP_CACHE_TTL', 300))
+INDEX_STATS_CACHE_TTL = int(os.getenv('INDEX_STATS_CACHE_TTL', 60))
+SEGMENT_SIZE_CACHE_TTL = int(os.getenv('SEGMENT_SIZE_CACHE_TTL', 600))
+ARTICLES_CACHE_TTL = int(os.getenv('ARTICLES_CACHE_TTL', 600))
+DETAIL_CACHE_TTL = int(os.getenv('DETAIL_CACHE_TTL', 900))
+LIST_CACHE_TTL = int(os.getenv('LIST_CACHE_TTL', 900))
+LAYOUT_CACHE_TTL = int(os.getenv('LAYOUT_CACHE_TTL', 3600))
+
+# In-process cache settings (first tier in front of Redis)
+LOCAL_CACHE_TTL = float(os.getenv('LOCAL_CACHE_TTL', 5))
+LOCAL_CACHE_SIZE = int(os.getenv('LOCAL_CACHE_SIZE', 256))
+
 if CACHE_ENABLED:
     CACHES = {
         'default': {
@@ -179,3 +232,39 @@ if CACHE_ENABLED:
             'LOCATION': os.getenv('REDIS_LOCATION')
         }
     }
+
+# Logging settings
+# журнал аудита массовой смены статусов рассылок пишется в stderr и, если задан AUDIT_LOG_FILE, в файл
+AUDIT_LOG_FILE = os.getenv('AUDIT_LOG_FILE')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'audit': {
+            'format': '{asctime} {name} {levelname} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'audit_console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'audit',
+        },
+    },
+    'loggers': {
+        'mailings.audit': {
+            'handlers': ['audit_console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+if AUDIT_LOG_FILE:
+    LOGGING['handlers']['audit_file'] = {
+        'class': 'logging.handlers.WatchedFileHandler',
+        'filename': AUDIT_LOG_FILE,
+        'formatter': 'audit',
+    }
+    LOGGING['loggers']['mailings.audit']['handlers'].append('audit_file')
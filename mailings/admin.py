@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 from mailings.models import (
-    Client, MailingRegularity, MailingStatus, Mailing, MailingLogs
+    Client, MailingRegularity, MailingStatus, Mailing, MailingLogs, MailingLogsDaily, MailingDelivery, Segment
 )
 
 
@@ -12,6 +12,13 @@ class ClientAdmin(admin.ModelAdmin):
     ordering = ('pk',)
 
 
+@admin.register(Segment)
+class SegmentAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'user', 'rule_field', 'rule_lookup', 'rule_value',)
+    raw_id_fields = ('user', 'clients',)
+    ordering = ('pk',)
+
+
 @admin.register(MailingRegularity)
 class MailingRegularityAdmin(admin.ModelAdmin):
     list_display = ('pk', 'name',)
@@ -37,3 +44,20 @@ class MailingLogsAdmin(admin.ModelAdmin):
     list_display = ('mailing', 'attempt_datetime', 'status',)
     list_filter = ('status',)
     ordering = ('-attempt_datetime',)
+
+
+@admin.register(MailingLogsDaily)
+class MailingLogsDailyAdmin(admin.ModelAdmin):
+    list_display = ('mailing', 'date', 'attempts', 'successes',)
+    ordering = ('-date',)
+
+
+@admin.register(MailingDelivery)
+class MailingDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('email', 'mailing', 'attempt_datetime', 'status', 'smtp_code',)
+    list_filter = ('status',)
+    list_select_related = ('mailing',)
+    raw_id_fields = ('mailing', 'client',)
+    search_fields = ('email',)
+    ordering = ('-attempt_datetime',)
+    show_full_result_count = False
@@ -5,3 +5,6 @@ class MailingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'mailings'
     verbose_name = 'рассылки'
+
+    def ready(self) -> None:
+        import mailings.signals  # noqa: F401
@@ -0,0 +1,592 @@
+from blog.models import Article
+from blog.services import article_views, articles_cache
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.contrib.auth.tokens import default_token_generator
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.template.base import Template
+from django.test import Client as TestClient
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+import json
+import os
+import random
+import socketserver
+import statistics
+import threading
+import time
+
+from datetime import timedelta
+from typing import Iterable, Iterator
+
+from PIL import Image
+
+from mailings.models import Client, Mailing, MailingLogs, Segment
+from mailings.services.lookups import (
+    REGULARITY_PERIODS, STATUS_CREATED, STATUS_FINISHED, STATUS_RUNNING, get_regularity_object, get_status_object,
+    mailing_regularities, mailing_statuses
+)
+from mailings.services.utils import iter_batches
+
+from users.models import User
+
+# пространства имен маршрутов, которые проходит нагрузочный тест
+BENCH_NAMESPACES = ('mailings', 'users', 'blog')
+
+# роли пользователей, от имени которых запрашивается каждый маршрут
+BENCH_ROLES = ('anonymous', 'service_users', 'manager', 'blog_manager')
+
+# нагрузочные тесты работают с отдельным кэшем в памяти процесса: данные тестовой базы не попадают
+# в рабочий кэш, а очистка кэша между маршрутами не затрагивает Redis сервиса
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench',
+    }
+}
+
+
+class QueryRecorder:
+    '''
+    Обертка выполнения SQL-запросов, считающая количество
+    запросов и суммарное время их выполнения в базе данных
+    '''
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.time = 0.0
+        self.__lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self.__lock:
+                self.time += time.perf_counter() - start
+                self.count += 1
+
+
+class TemplateRenderTimer:
+    '''
+    Счетчик времени рендеринга шаблонов. На время блока with оборачивает
+    Template.render и учитывает только внешние вызовы: время вложенных
+    шаблонов (extends, include) входит во время страницы
+    '''
+
+    def __init__(self) -> None:
+        self.time = 0.0
+        self.__depth = 0
+        self.__render = None
+
+    def __enter__(self) -> 'TemplateRenderTimer':
+        self.__render = Template.render
+        timer = self
+
+        def timed_render(template: Template, context) -> str:
+            return timer.render(template, context)
+
+        Template.render = timed_render
+
+        return self
+
+    def __exit__(self, *args) -> None:
+        Template.render = self.__render
+
+    def render(self, template: Template, context) -> str:
+        '''
+        Рендерит шаблон и учитывает время рендеринга
+        :param template: шаблон
+        :param context: контекст шаблона
+        :return: результат рендеринга
+        '''
+        if self.__depth:
+            return self.__render(template, context)
+
+        self.__depth += 1
+        start = time.perf_counter()
+
+        try:
+            return self.__render(template, context)
+        finally:
+            self.time += time.perf_counter() - start
+            self.__depth -= 1
+
+
+class SMTPSink:
+    '''
+    Локальный SMTP-сервер для нагрузочного теста отправки. Письма
+    принимаются и не доставляются. Сервер может отвечать с задержкой
+    latency секунд на каждое письмо, отклонять получателей с вероятностью
+    fail_rate и обрывать соединение после письма с вероятностью drop_rate
+    '''
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0, drop_rate: float = 0.0,
+                 seed: int = None) -> None:
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.stats = {'connections': 0, 'accepted': 0, 'rejected': 0, 'dropped': 0}
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__server = None
+
+    def __chance(self, rate: float) -> bool:
+        with self.__lock:
+            return rate > 0 and self.__random.random() < rate
+
+    def __count(self, name: str) -> None:
+        with self.__lock:
+            self.stats[name] += 1
+
+    def handle_connection(self, rfile, wfile) -> None:
+        '''
+        Обрабатывает одно SMTP-соединение
+        :param rfile: поток чтения сокета
+        :param wfile: поток записи сокета
+        '''
+        def reply(line: str) -> None:
+            wfile.write(f'{line}\r\n'.encode())
+
+        self.__count('connections')
+        reply('220 bench SMTP sink')
+
+        while True:
+            line = rfile.readline()
+
+            if not line:
+                return
+
+            command = line.decode(errors='replace').strip().upper()
+
+            if command.startswith(('EHLO', 'HELO')):
+                reply('250 bench')
+            elif command.startswith('RCPT') and self.__chance(self.fail_rate):
+                self.__count('rejected')
+                reply('550 mailbox unavailable')
+            elif command == 'DATA':
+                reply('354 end data with <CR><LF>.<CR><LF>')
+
+                while rfile.readline() not in (b'.\r\n', b''):
+                    pass
+
+                if self.latency:
+                    time.sleep(self.latency)
+
+                self.__count('accepted')
+                reply('250 queued')
+
+                if self.__chance(self.drop_rate):
+                    self.__count('dropped')
+                    return
+            elif command == 'QUIT':
+                reply('221 bye')
+                return
+            else:
+                reply('250 ok')
+
+    def start(self) -> int:
+        '''
+        Запускает сервер в фоновом потоке
+        :return: порт сервера
+        '''
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                sink.handle_connection(self.rfile, self.wfile)
+
+        self.__server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.__server.daemon_threads = True
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+
+        return self.__server.server_address[1]
+
+    def stop(self) -> None:
+        '''
+        Останавливает сервер
+        '''
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+
+    def __enter__(self) -> 'SMTPSink':
+        self.port = self.start()
+
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+def create_bench_database(keepdb: bool = False) -> str:
+    '''
+    Функция создает тестовую базу данных и загружает в нее database_data.json
+    :param keepdb: использовать существующую тестовую базу данных
+    :return: имя рабочей базы данных для destroy_bench_database
+    '''
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb)
+    ContentType.objects.all().delete()
+    call_command('loaddata', 'database_data.json', verbosity=0)
+
+    return old_name
+
+
+def destroy_bench_database(old_name: str, keepdb: bool = False) -> None:
+    '''
+    Функция удаляет тестовую базу данных и возвращает подключение к рабочей.
+    Непереданные просмотры статей из памяти процесса отбрасываются, чтобы
+    они не были записаны в рабочую базу данных
+    :param old_name: имя рабочей базы данных
+    :param keepdb: не удалять тестовую базу данных
+    '''
+    article_views.discard()
+    connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def seed_scale_data(users: int, clients: int, mailings: int, logs: int, articles: int,
+                    batch_size: int = 5000) -> dict[str, object]:
+    '''
+    Функция заполняет базу данных синтетическими данными для нагрузочного
+    теста. Клиенты, рассылки и логи распределяются между пользователями по
+    кругу, первый пользователь используется как владелец объектов в
+    маршрутах. Изображение статей создается в папке MEDIA_ROOT
+    :param users: количество пользователей сервиса
+    :param clients: количество клиентов
+    :param mailings: количество рассылок
+    :param logs: количество логов рассылок
+    :param articles: количество статей блога
+    :param batch_size: размер порции bulk_create
+    :return: объекты, используемые в параметрах маршрутов
+    '''
+    users = max(users, 1)
+    password = make_password(None)
+    now = timezone.now()
+
+    User.objects.bulk_create(
+        (User(email=f'bench{i}@example.com', password=password) for i in range(users)), batch_size=batch_size
+    )
+    user_pks = list(User.objects.filter(email__startswith='bench').order_by('pk').values_list('pk', flat=True))
+    service_users = Group.objects.get(name='service_users')
+    User.groups.through.objects.bulk_create(
+        (User.groups.through(user_id=pk, group=service_users) for pk in user_pks), batch_size=batch_size
+    )
+
+    for batch in iter_batches((
+        Client(fullname=f'Клиент {i}', email=f'client{i}@example.com', user_id=user_pks[i % users])
+        for i in range(max(clients, 1))
+    ), batch_size):
+        Client.objects.bulk_create(batch)
+
+    statuses = [get_status_object(name) for name in (STATUS_CREATED, STATUS_RUNNING, STATUS_FINISHED)]
+    regularities = [None] + [get_regularity_object(name) for name in REGULARITY_PERIODS]
+
+    # статусы меняются по кругам пользователей, чтобы у каждого были рассылки всех статусов
+    for batch in iter_batches((
+        Mailing(
+            title=f'Рассылка {i}', body='Текст рассылки', slug=f'bench-{i}', user_id=user_pks[i % users],
+            status=statuses[i // users % len(statuses)], regularity=regularities[i % len(regularities)],
+            sending_time=now + timedelta(days=1)
+        )
+        for i in range(max(mailings, 1))
+    ), batch_size):
+        Mailing.objects.bulk_create(batch)
+
+    mailing_pks = list(Mailing.objects.filter(slug__startswith='bench-').order_by('pk').values_list('pk', flat=True))
+
+    for batch in iter_batches((
+        MailingLogs(
+            mailing_id=mailing_pks[i % len(mailing_pks)], attempt_datetime=now - timedelta(minutes=i),
+            status=bool(i % 5)
+        )
+        for i in range(logs if mailing_pks else 0)
+    ), batch_size):
+        MailingLogs.objects.bulk_create(batch)
+
+    image_name = 'blog/bench.jpg'
+    os.makedirs(os.path.join(settings.MEDIA_ROOT, 'blog'), exist_ok=True)
+    Image.new('RGB', (1200, 800), (200, 200, 200)).save(os.path.join(settings.MEDIA_ROOT, image_name))
+    Article.objects.bulk_create(
+        Article(title=f'Статья {i}', body='Текст статьи', image=image_name) for i in range(max(articles, 1))
+    )
+
+    owner = User.objects.get(pk=user_pks[0])
+    owner_mailings = Mailing.objects.filter(user=owner)
+    pending = User.objects.create(email='bench-pending@example.com', password=password, is_active=False)
+    segment = Segment.objects.create(
+        name='Клиенты 1', user=owner, rule_field='email', rule_lookup='istartswith', rule_value='client1'
+    )
+
+    return {
+        'owner': owner,
+        'created_mailing': owner_mailings.filter(status=statuses[0]).first(),
+        'running_mailing': owner_mailings.filter(status=statuses[1]).first(),
+        'client': Client.objects.filter(user=owner).first(),
+        'article': Article.objects.first(),
+        'pending': pending,
+        'segment': segment,
+    }
+
+
+def seed_dispatch_data(mailings: int, clients: int, users: int, batch_size: int = 5000) -> int:
+    '''
+    Функция создает рассылки, время отправки которых наступило, и клиентов
+    их пользователей для нагрузочного теста отправки. Рассылки
+    распределяются между пользователями по кругу, у каждого пользователя
+    clients клиентов
+    :param mailings: количество рассылок
+    :param clients: количество клиентов одного пользователя
+    :param users: количество пользователей
+    :param batch_size: размер порции bulk_create
+    :return: количество писем, которые будут отправлены
+    '''
+    users = max(min(users, mailings), 1)
+    password = make_password(None)
+    User.objects.bulk_create(
+        (User(email=f'sender{i}@example.com', password=password) for i in range(users)), batch_size=batch_size
+    )
+    user_pks = list(User.objects.filter(email__startswith='sender').order_by('pk').values_list('pk', flat=True))
+
+    for batch in iter_batches((
+        Client(fullname=f'Клиент {i}', email=f'client{i}-{pk}@example.com', user_id=pk)
+        for pk in user_pks for i in range(clients)
+    ), batch_size):
+        Client.objects.bulk_create(batch)
+
+    status = get_status_object(STATUS_CREATED)
+    sending_time = timezone.now() - timedelta(minutes=1)
+
+    for batch in iter_batches((
+        Mailing(
+            title=f'bench mailing {i}', body='Bench mailing body', slug=f'bench-dispatch-{i}',
+            user_id=user_pks[i % users], status=status, sending_time=sending_time
+        )
+        for i in range(mailings)
+    ), batch_size):
+        Mailing.objects.bulk_create(batch)
+
+    return mailings * clients
+
+
+def percentile(values: list[float], percent: float) -> float:
+    '''
+    Функция возвращает перцентиль значений методом ближайшего ранга
+    :param values: значения
+    :param percent: перцентиль от 0 до 100
+    :return: значение перцентиля или 0, если значений нет
+    '''
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+    index = max(int(len(values) * percent / 100 + 0.5) - 1, 0)
+
+    return values[min(index, len(values) - 1)]
+
+
+def create_role_users() -> dict[str, User | None]:
+    '''
+    Функция создает пользователей с ролями менеджера и блог-менеджера
+    :return: словарь роль - пользователь
+    '''
+    roles = {'anonymous': None}
+
+    for role in ('manager', 'blog_manager'):
+        user = User.objects.create(email=f'bench-{role}@example.com', is_staff=True)
+        user.groups.add(Group.objects.get(name=role))
+        roles[role] = user
+
+    return roles
+
+
+def get_route_kwargs(samples: dict[str, object]) -> dict[str, dict[str, object]]:
+    '''
+    Функция возвращает параметры маршрутов, которые содержат
+    параметры в пути. Маршрут с параметрами, не указанный здесь,
+    останавливает тест
+    :param samples: объекты, созданные seed_scale_data
+    :return: словарь имя маршрута - параметры
+    '''
+    owner = samples['owner']
+    pending = samples['pending']
+    created_slug = samples['created_mailing'].slug
+    running_slug = samples['running_mailing'].slug if samples['running_mailing'] else created_slug
+
+    return {
+        'mailings:mailing_detail': {'slug': created_slug},
+        'mailings:mailing_update': {'slug': created_slug},
+        'mailings:mailing_delete': {'slug': created_slug},
+        'mailings:mailing_status': {'slug': running_slug},
+        'mailings:client_detail': {'pk': samples['client'].pk},
+        'mailings:client_update': {'pk': samples['client'].pk},
+        'mailings:client_delete': {'pk': samples['client'].pk},
+        'users:user_detail': {'pk': owner.pk},
+        'users:user_change_active': {'pk': owner.pk},
+        'users:email_confirm': {
+            'uidb64': urlsafe_base64_encode(force_bytes(pending.pk)),
+            'token': default_token_generator.make_token(pending),
+        },
+        'mailings:segment_detail': {'pk': samples['segment'].pk},
+        'mailings:segment_update': {'pk': samples['segment'].pk},
+        'mailings:segment_delete': {'pk': samples['segment'].pk},
+        'blog:article_detail': {'pk': samples['article'].pk},
+        'blog:article_update': {'pk': samples['article'].pk},
+        'blog:article_delete': {'pk': samples['article'].pk},
+    }
+
+
+def iter_route_names(namespaces: Iterable[str] = BENCH_NAMESPACES) -> Iterator[tuple[str, bool]]:
+    '''
+    Функция возвращает имена всех маршрутов переданных пространств имен
+    :param namespaces: пространства имен
+    :return: генератор пар (имя маршрута, есть ли параметры в пути)
+    '''
+    for resolver in get_resolver().url_patterns:
+        if not isinstance(resolver, URLResolver) or resolver.namespace not in namespaces:
+            continue
+
+        for pattern in resolver.url_patterns:
+            if isinstance(pattern, URLPattern) and pattern.name:
+                yield f'{resolver.namespace}:{pattern.name}', bool(pattern.pattern.converters)
+
+
+def reset_caches() -> None:
+    '''
+    Функция очищает кэш и справочники, чтобы каждый маршрут
+    измерялся с одинаковым, холодным состоянием кэша. Очищается только
+    кэш BENCH_CACHES, с рабочим кэшем функция завершается ошибкой
+    '''
+    if settings.CACHES != BENCH_CACHES:
+        raise RuntimeError('Нагрузочный тест должен работать с кэшем BENCH_CACHES, рабочий кэш не очищается')
+
+    cache.clear()
+    articles_cache.clear()
+    mailing_statuses.invalidate()
+    mailing_regularities.invalidate()
+
+
+def measure_route(url: str, user: User | None, repeat: int) -> dict[str, object]:
+    '''
+    Функция запрашивает адрес repeat раз от имени пользователя и возвращает
+    статус ответа, количество запросов при холодном и прогретом кэше,
+    медианное время в базе данных, рендеринга шаблонов и общее время ответа
+    :param url: адрес страницы
+    :param user: пользователь или None для анонимного запроса
+    :param repeat: количество запросов
+    :return: метрики маршрута
+    '''
+    reset_caches()
+    queries, db_times, render_times, wall_times = [], [], [], []
+    status_code = None
+
+    for _ in range(max(repeat, 1)):
+        client = TestClient()
+
+        if user is not None:
+            client.force_login(user)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+
+        with connection.execute_wrapper(recorder), TemplateRenderTimer() as timer:
+            response = client.get(url)
+
+        wall_times.append(time.perf_counter() - start)
+        db_times.append(recorder.time)
+        render_times.append(timer.time)
+        queries.append(recorder.count)
+        status_code = response.status_code
+
+    return {
+        'status': status_code,
+        'queries': queries[0],
+        'warm_queries': queries[-1],
+        'db_ms': round(statistics.median(db_times) * 1000, 2),
+        'render_ms': round(statistics.median(render_times) * 1000, 2),
+        'wall_ms': round(statistics.median(wall_times) * 1000, 2),
+    }
+
+
+def run_routes(samples: dict[str, object], roles: dict[str, User | None], repeat: int = 3) -> dict[str, dict]:
+    '''
+    Функция измеряет все маршруты от имени всех ролей
+    :param samples: объекты, созданные seed_scale_data
+    :param roles: словарь роль - пользователь
+    :param repeat: количество запросов к каждому маршруту
+    :return: словарь "роль маршрут" - метрики
+    '''
+    route_kwargs = get_route_kwargs(samples)
+    results = {}
+
+    for name, has_params in iter_route_names():
+        if has_params and name not in route_kwargs:
+            raise ValueError(f'Не заданы параметры маршрута {name}')
+
+        url = reverse(name, kwargs=route_kwargs.get(name))
+
+        for role in BENCH_ROLES:
+            results[f'{role} {name}'] = measure_route(url, roles[role], repeat)
+
+    return results
+
+
+def load_baseline(path: str) -> dict[str, dict] | None:
+    '''
+    Функция загружает сохраненные результаты теста
+    :param path: путь к файлу
+    :return: результаты или None, если файла нет
+    '''
+    if not os.path.exists(path):
+        return None
+
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_baseline(path: str, results: dict[str, dict], meta: dict[str, object]) -> None:
+    '''
+    Функция сохраняет результаты теста в JSON-файл
+    :param path: путь к файлу
+    :param results: метрики маршрутов
+    :param meta: параметры запуска
+    '''
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'meta': meta, 'routes': results}, file, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def find_regressions(results: dict[str, dict], baseline: dict[str, dict]) -> list[str]:
+    '''
+    Функция сравнивает результаты с сохраненными и возвращает описание
+    маршрутов, у которых выросло количество запросов или изменился
+    статус ответа. Время не сравнивается - оно зависит от машины
+    :param results: метрики маршрутов
+    :param baseline: сохраненные результаты
+    :return: список регрессий
+    '''
+    regressions = []
+
+    for key, metrics in results.items():
+        expected = baseline['routes'].get(key)
+
+        if expected is None:
+            continue
+
+        if metrics['status'] != expected['status']:
+            regressions.append(f'{key}: статус {expected["status"]} -> {metrics["status"]}')
+
+        for field in ('queries', 'warm_queries'):
+            if metrics[field] > expected[field]:
+                regressions.append(f'{key}: {field} {expected[field]} -> {metrics[field]}')
+
+    return regressions
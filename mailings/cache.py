@@ -0,0 +1,226 @@
+from django.conf import settings
+from django.core.cache import cache
+
+import math
+import random
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class LocalLRUCache:
+    '''
+    LRU-кэш в памяти процесса. Хранит не более max_size записей, при
+    переполнении удаляется запись, к которой дольше всего не обращались.
+    Запись перестает возвращаться по истечении её времени жизни
+    '''
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.__items = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        '''
+        Возвращает значение записи или default, если записи нет или она устарела
+        :param key: ключ записи
+        :param default: значение по умолчанию
+        :return: значение записи
+        '''
+        with self.__lock:
+            item = self.__items.get(key)
+
+            if item is None:
+                return default
+
+            value, expires_at = item
+
+            if expires_at < time.monotonic():
+                del self.__items[key]
+                return default
+
+            self.__items.move_to_end(key)
+
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        '''
+        Сохраняет запись
+        :param key: ключ записи
+        :param value: значение записи
+        :param ttl: время жизни записи, сек.
+        '''
+        with self.__lock:
+            self.__items[key] = (value, time.monotonic() + ttl)
+            self.__items.move_to_end(key)
+
+            while len(self.__items) > self.max_size:
+                self.__items.popitem(last=False)
+
+    def clear(self) -> None:
+        '''
+        Удаляет все записи
+        '''
+        with self.__lock:
+            self.__items.clear()
+
+
+class VersionedCache:
+    '''
+    Двухуровневый кэш значений с версией. Первый уровень - LRU в памяти
+    процесса, записи которого живут local_ttl секунд, второй - Redis
+    (если CACHE_ENABLED). Ключи содержат версию, bump() увеличивает её,
+    и все прежние значения перестают использоваться без удаления ключей.
+    Другие процессы получают новую версию из Redis не позже, чем через
+    local_ttl секунд.
+
+    Защита от одновременного пересчета: в процессе значение ключа
+    вычисляет только один поток, между процессами - только владелец
+    блокировки в Redis, остальные получают прежнее значение или ждут
+    нового. Значение пересчитывается заранее, до истечения ttl, с
+    вероятностью, растущей к концу срока и со временем вычисления (XFetch)
+    '''
+    # сколько ждать значение, которое вычисляет другой процесс, сек.
+    lock_timeout = 10
+    poll_interval = 0.05
+
+    def __init__(self, name: str, ttl: int, local_ttl: float = None, local_size: int = None,
+                 beta: float = 1.0) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.local_ttl = local_ttl if local_ttl is not None else settings.LOCAL_CACHE_TTL
+        self.beta = beta
+        self.version_key = f'{name}_version'
+        self.__local = LocalLRUCache(local_size or settings.LOCAL_CACHE_SIZE)
+        self.__version = 0
+        self.__locks = {}
+        self.__lock = threading.Lock()
+
+    def get_version(self) -> int:
+        '''
+        Возвращает текущую версию кэша
+        :return: версия
+        '''
+        if not settings.CACHE_ENABLED:
+            return self.__version
+
+        version = self.__local.get(self.version_key)
+
+        if version is None:
+            version = cache.get(self.version_key)
+
+            if version is None:
+                # версия начинается со времени, чтобы после вытеснения ключа не вернуться к старым значениям
+                cache.add(self.version_key, time.time_ns() // 1000, timeout=None)
+                version = cache.get(self.version_key, 0)
+
+            self.__local.set(self.version_key, version, self.local_ttl)
+
+        return version
+
+    def bump(self) -> None:
+        '''
+        Увеличивает версию кэша, после чего все сохраненные значения устаревают
+        '''
+        if settings.CACHE_ENABLED:
+            try:
+                cache.incr(self.version_key)
+            except ValueError:
+                cache.add(self.version_key, time.time_ns() // 1000, timeout=None)
+
+        with self.__lock:
+            self.__version += 1
+
+        self.__local.clear()
+
+    def clear(self) -> None:
+        '''
+        Очищает кэш в памяти процесса
+        '''
+        self.__local.clear()
+
+    def get_or_set(self, key: str, loader: Callable[[], Any]) -> Any:
+        '''
+        Возвращает значение ключа из кэша, а если его нет - вычисляет
+        значение функцией loader и сохраняет его
+        :param key: ключ значения
+        :param loader: функция вычисления значения
+        :return: значение
+        '''
+        full_key = f'{self.name}:{self.get_version()}:{key}'
+        entry = self.__local.get(full_key)
+
+        if entry is None:
+            entry = self.__load(key, full_key, loader)
+
+        return entry[0]
+
+    def __get_key_lock(self, key: str) -> threading.Lock:
+        with self.__lock:
+            return self.__locks.setdefault(key, threading.Lock())
+
+    def __load(self, key: str, full_key: str, loader: Callable[[], Any]) -> tuple[Any, float, float]:
+        # значение ключа вычисляет один поток процесса, остальные ждут его
+        with self.__get_key_lock(key):
+            entry = self.__local.get(full_key)
+
+            if entry is not None:
+                return entry
+
+            if settings.CACHE_ENABLED:
+                entry = cache.get(full_key)
+
+                if entry is None or self.__should_refresh(entry):
+                    entry = self.__refresh(full_key, loader, entry)
+            else:
+                entry = self.__compute(loader)
+
+            self.__local.set(full_key, entry, self.local_ttl)
+
+            return entry
+
+    def __should_refresh(self, entry: tuple[Any, float, float]) -> bool:
+        _, delta, expires_at = entry
+
+        return time.time() - delta * self.beta * math.log(1 - random.random()) >= expires_at
+
+    def __compute(self, loader: Callable[[], Any]) -> tuple[Any, float, float]:
+        start = time.time()
+        value = loader()
+        now = time.time()
+
+        return value, now - start, now + self.ttl
+
+    def __refresh(self, full_key: str, loader: Callable[[], Any],
+                  stale: tuple[Any, float, float] | None) -> tuple[Any, float, float]:
+        lock_key = f'{full_key}:lock'
+        deadline = time.monotonic() + self.lock_timeout
+        locked = cache.add(lock_key, 1, self.lock_timeout)
+
+        # значение уже вычисляет другой процесс
+        while not locked:
+            if stale is not None:
+                return stale
+
+            time.sleep(self.poll_interval)
+            entry = cache.get(full_key)
+
+            if entry is not None:
+                return entry
+
+            if time.monotonic() >= deadline:
+                break
+
+            locked = cache.add(lock_key, 1, self.lock_timeout)
+
+        try:
+            entry = self.__compute(loader)
+            # значение хранится дольше ttl, чтобы его можно было отдавать во время пересчета
+            cache.set(full_key, entry, self.ttl * 2)
+        finally:
+            if locked:
+                cache.delete(lock_key)
+
+        return entry
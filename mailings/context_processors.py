@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject
+
+from typing import Any
+
+from mailings.services.access import get_layout_cache_key
+
+
+def layout_cache(request: HttpRequest) -> dict[str, Any]:
+    '''
+    Добавляет в контекст шаблонов ключ и время жизни кэша меню и подвала
+    страниц. Ключ вычисляется только при рендеринге тега {% cache %}
+    :param request: запрос
+    :return: переменные контекста
+    '''
+    return {
+        'layout_cache_key': SimpleLazyObject(lambda: get_layout_cache_key(request.user)),
+        'layout_cache_ttl': settings.LAYOUT_CACHE_TTL,
+    }
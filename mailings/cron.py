@@ -1,11 +1,124 @@
-import datetime
+import queue
+import threading
+import time
 
-from django.db.models import Q
+from collections import Counter, defaultdict, deque
+from typing import Iterator
 
-from mailings.models import (
-    Mailing, MailingStatus, MailingLogs, MailingRegularity, Client
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from mailings.models import Mailing, MailingDelivery, MailingLogs
+from mailings.services.dispatch import (
+    MailingLeaseLost, claim_due_mailings, complete_mailing_send, get_attempt_deliveries, get_mailing_recipients,
+    get_worker_name, release_mailing_lease, renew_mailing_lease
 )
-from mailings.services import send_email
+from mailings.services.logs import compact_mailing_logs, purge_expired_deliveries
+from mailings.services.lookups import STATUS_CREATED, STATUS_RUNNING, get_status_object
+from mailings.services.sending import SMTPConnectionPool, SMTPUnavailableError, get_delivery_status, send_bulk_email
+from mailings.services.utils import BulkCreateBuffer, iter_batches
+
+
+class MailingDispatcher:
+    '''
+    Пул потоков для параллельной отправки рассылок. Каждый поток работает
+    со своим соединением с базой данных и сам сохраняет логи отправленных
+    рассылок и доставок пакетами, в том числе по истечении
+    MAILING_LOGS_FLUSH_INTERVAL, пока поток ждет следующую рассылку.
+    Одновременно отправляется не более per_user рассылок одного пользователя,
+    чтобы медленный SMTP-сервер одного пользователя не задерживал
+    рассылки остальных. Перед отправкой захват рассылки продлевается, если
+    захват потерян - рассылку уже отправляет другой обработчик
+    '''
+
+    def __init__(self, pool: SMTPConnectionPool, worker: str, workers: int = None, per_user: int = None) -> None:
+        self.pool = pool
+        self.worker = worker
+        self.workers = workers or settings.MAILING_DISPATCH_WORKERS
+        self.per_user = per_user or settings.MAILING_DISPATCH_PER_USER
+        self.__tasks = queue.Queue()
+        self.__done = queue.Queue()
+
+    def __work(self) -> None:
+        try:
+            with BulkCreateBuffer(MailingLogs) as logs, BulkCreateBuffer(MailingDelivery) as deliveries:
+                while True:
+                    try:
+                        mailing = self.__tasks.get(timeout=logs.flush_interval)
+                    except queue.Empty:
+                        # новых рассылок нет - сохранение записей, которые ждут дольше flush_interval
+                        logs.flush_if_due()
+                        deliveries.flush_if_due()
+                        continue
+
+                    if mailing is None:
+                        break
+
+                    try:
+                        if renew_mailing_lease(mailing, self.worker):
+                            send_mailing(mailing, self.pool, logs, deliveries)
+                    except Exception as e:
+                        print(f'Ошибка отправки рассылки {mailing.pk} - {e}')
+                    finally:
+                        self.__done.put(mailing.user_id)
+        finally:
+            connection.close()
+
+    def run(self, batches: Iterator[list[Mailing]]) -> None:
+        '''
+        Отправляет все рассылки из переданных порций. Следующая порция
+        запрашивается только тогда, когда у пула есть свободные потоки, а в
+        очереди ожидания меньше workers * per_user рассылок. Иначе рассылки
+        одного пользователя, которые ждут из-за лимита per_user, заставили бы
+        захватить сразу все рассылки к отправке
+        :param batches: порции рассылок к отправке
+        '''
+        threads = [threading.Thread(target=self.__work, daemon=True) for _ in range(self.workers)]
+        waiting = defaultdict(deque)
+        running = Counter()
+        in_flight = 0
+        queued = 0
+        max_queued = self.workers * self.per_user
+        exhausted = False
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                # передача потокам рассылок тех пользователей, у которых не превышен лимит
+                for user_id, mailings in waiting.items():
+                    while mailings and running[user_id] < self.per_user:
+                        self.__tasks.put(mailings.popleft())
+                        running[user_id] += 1
+                        in_flight += 1
+                        queued -= 1
+
+                if in_flight < self.workers and queued < max_queued and not exhausted:
+                    batch = next(batches, None)
+
+                    if batch is None:
+                        exhausted = True
+
+                    for mailing in batch or []:
+                        waiting[mailing.user_id].append(mailing)
+                        queued += 1
+
+                    continue
+
+                if not in_flight:
+                    break
+
+                user_id = self.__done.get()
+                running[user_id] -= 1
+                in_flight -= 1
+        finally:
+            for _ in threads:
+                self.__tasks.put(None)
+
+            for thread in threads:
+                thread.join()
 
 
 def cron_send_email() -> None:
@@ -17,37 +130,122 @@ def cron_send_email() -> None:
     рассылка переходит на статус "запущена". После каждой рассылки с
     указанной частотой, дата следующей отправки увеличивается на указанный
     срок (день, 7 дней, 30 дней). После каждой рассылки её логи сохраняются
-    и помещаются в базу данных.
+    и помещаются в базу данных. Рассылки отправляются параллельно пулом потоков.
     '''
-    now = datetime.datetime.now()
-    mailings = Mailing.objects.filter(
-        Q(status=MailingStatus.objects.get(name='создана')) |
-        Q(status=MailingStatus.objects.get(name='запущена'))
-    )
+    now = timezone.now()
+    statuses = [get_status_object(STATUS_CREATED), get_status_object(STATUS_RUNNING)]
+    worker = get_worker_name()
+    pool = SMTPConnectionPool()
 
-    # перебор всех рассылок со статусом "создана" или "запущена"
-    for mailing in mailings:
-        try:
-            # отправка e-mail рассылки, если настоящее время больше установленного для отправки
-            if mailing.sending_time.timestamp() < now.timestamp():
-                clients_email_list = [str(client.email) for client in Client.objects.filter(user=mailing.user)]
-                send_email(mailing.title, mailing.body, clients_email_list)
-                MailingLogs.objects.create(mailing=mailing)
-
-                # изменение статуса рассылки на "запущена", если у нее имеется частота отправки
-                if mailing.regularity:
-                    mailing.status = MailingStatus.objects.get(name='запущена')
-                    mailing.save()
-                    # увелечение даты следующей отправки
-                    if mailing.regularity == MailingRegularity.objects.get(name='раз в день'):
-                        mailing.sending_time += datetime.timedelta(days=1)
-                    elif mailing.regularity == MailingRegularity.objects.get(name='раз в неделю'):
-                        mailing.sending_time += datetime.timedelta(days=7)
-                    else:
-                        mailing.sending_time += datetime.timedelta(days=30)
-                else:
-                    mailing.status = MailingStatus.objects.get(name='завершена')
-
-                mailing.save()
-        except Exception as e:
-            MailingLogs.objects.create(mailing=mailing, status=False, server_response=f'{e}')
+    try:
+        # захват рассылок со статусом "создана" или "запущена", время отправки которых наступило, порциями
+        MailingDispatcher(pool, worker).run(claim_due_mailings(now, statuses, worker))
+    finally:
+        pool.close()
+
+
+def cron_purge_deliveries() -> None:
+    '''
+    Функция удаляет доставки рассылок, срок хранения которых истек
+    '''
+    purge_expired_deliveries()
+
+
+def cron_compact_logs() -> None:
+    '''
+    Функция сворачивает старые логи рассылок в суточные сводки
+    '''
+    compact_mailing_logs()
+
+
+def send_mailing(mailing: Mailing, pool: SMTPConnectionPool = None, logs: BulkCreateBuffer = None,
+                 deliveries: BulkCreateBuffer = None) -> None:
+    '''
+    Функция отправляет одну рассылку каждому клиенту её сегмента (или всем
+    клиентам пользователя, если сегмент не выбран) отдельным письмом,
+    сохраняет её лог и доставку каждому клиенту и переводит рассылку
+    на следующий срок отправки. Клиенты отправляются порциями по
+    MAILING_SEND_CHUNK_SIZE, доставки каждой порции сохраняются сразу после
+    её отправки, поэтому при повторной отправке после сбоя клиенты, которым
+    письмо уже отправлено в этой попытке, пропускаются. Между порциями захват
+    рассылки продлевается, если захват потерян - отправка прекращается,
+    рассылку уже отправляет другой обработчик
+    :param mailing: рассылка сервиса
+    :param pool: пул SMTP-соединений
+    :param logs: буфер логов рассылок, если не передан - лог сохраняется сразу
+    :param deliveries: буфер доставок рассылок, если не передан - доставки сохраняются сразу
+    '''
+    if logs is None or deliveries is None:
+        with BulkCreateBuffer(MailingLogs) as logs, BulkCreateBuffer(MailingDelivery) as deliveries:
+            return send_mailing(mailing, pool, logs, deliveries)
+
+    worker = mailing.claimed_by
+    # захват продлевается заранее, пока не истекла и треть его срока
+    renew_interval = settings.MAILING_LEASE_SECONDS / 3
+    renew_at = time.monotonic() + renew_interval
+    total = 0
+    failed = 0
+    first_error = None
+
+    def save_deliveries(clients: dict[str, int], results: list[tuple[str, Exception | None]]) -> None:
+        nonlocal total, failed, first_error
+        attempt_datetime = timezone.now()
+
+        for email, error in results:
+            status, smtp_code = get_delivery_status(error)
+            deliveries.add(
+                mailing=mailing, client_id=clients[email], email=email,
+                attempt_datetime=attempt_datetime, status=status, smtp_code=smtp_code
+            )
+
+            if error is not None:
+                failed += 1
+                first_error = first_error or (email, error)
+
+        total += len(results)
+        deliveries.flush()
+
+    try:
+        recipients = get_mailing_recipients(mailing).values_list('email', 'pk').iterator()
+        # повторная отправка после сбоя - часть клиентов уже получила письмо
+        resumed = get_attempt_deliveries(mailing).exists()
+
+        for chunk in iter_batches(recipients, settings.MAILING_SEND_CHUNK_SIZE):
+            if worker is not None and time.monotonic() >= renew_at:
+                if not renew_mailing_lease(mailing, worker):
+                    raise MailingLeaseLost(f'Захват рассылки {mailing.pk} перешел к другому обработчику')
+
+                renew_at = time.monotonic() + renew_interval
+
+            clients = dict(chunk)
+
+            if resumed:
+                delivered = set(
+                    get_attempt_deliveries(mailing).filter(client_id__in=clients.values())
+                    .values_list('client_id', flat=True)
+                )
+                clients = {email: pk for email, pk in clients.items() if pk not in delivered}
+
+            try:
+                results = send_bulk_email(mailing.title, mailing.body, clients.keys(), pool)
+            except SMTPUnavailableError as e:
+                save_deliveries(clients, e.results)
+                raise
+
+            save_deliveries(clients, results)
+
+        if first_error:
+            email, error = first_error
+            logs.add(
+                mailing=mailing, status=False,
+                server_response=f'Не доставлено {failed} из {total}. {email}: {error}'
+            )
+        else:
+            logs.add(mailing=mailing)
+
+        complete_mailing_send(mailing)
+    except MailingLeaseLost as e:
+        print(f'Отправка рассылки остановлена - {e}')
+    except Exception as e:
+        logs.add(mailing=mailing, status=False, server_response=f'{e}')
+        release_mailing_lease(mailing)
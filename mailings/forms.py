@@ -1,8 +1,12 @@
-from datetime import datetime
+from datetime import datetime, time, timedelta
 
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from django.db.models import QuerySet
+from django.utils import timezone
 
-from mailings.models import Mailing, Client
+from mailings.models import Mailing, Client, Segment
+from mailings.services.imports import get_import_format
 
 
 class MailingForm(forms.ModelForm):
@@ -12,13 +16,17 @@ class MailingForm(forms.ModelForm):
 
     class Meta:
         model = Mailing
-        fields = ('title', 'body', 'sending_time', 'regularity',)
+        fields = ('title', 'body', 'sending_time', 'regularity', 'segment',)
         widgets = {'sending_time': forms.DateTimeInput(attrs={'type': 'datetime-local'})}
 
     def __init__(self, *args, **kwargs) -> None:
+        self.user = kwargs.pop('user')
+
         super().__init__(*args, **kwargs)
         self.fields['sending_time'].help_text = 'Рассылка должна быть опубликована не ранее, ' \
                                                 'чем через минуту от текущего времени.'
+        self.fields['segment'].queryset = Segment.objects.filter(user=self.user).only('pk', 'name')
+        self.fields['segment'].help_text = 'Если сегмент не выбран, рассылка отправляется всем клиентам.'
 
     def clean_sending_time(self) -> datetime:
         cleaned_data = self.cleaned_data['sending_time']
@@ -54,3 +62,109 @@ class ClientForm(forms.ModelForm):
                 raise forms.ValidationError('Пользователь с таким e-mail существует!')
 
         return cleaned_data
+
+
+class SegmentForm(forms.ModelForm):
+    '''
+    Форма сегмента клиентов. Сегмент задается правилом по полю клиента
+    или статическим списком e-mail адресов клиентов
+    '''
+    emails = forms.CharField(
+        label='Клиенты', required=False, widget=forms.Textarea(attrs={'rows': 6}),
+        help_text='E-mail адреса клиентов по одному в строке, используются, если правило не задано. '
+                  'Заполненный список заменяет текущий состав сегмента.'
+    )
+
+    class Meta:
+        model = Segment
+        fields = ('name', 'rule_field', 'rule_lookup', 'rule_value',)
+
+    def clean(self) -> dict:
+        cleaned_data = super().clean()
+        rule = [cleaned_data.get(name) for name in ('rule_field', 'rule_lookup', 'rule_value')]
+
+        if any(rule) and not all(rule):
+            raise forms.ValidationError('Для правила нужно указать поле, условие и значение')
+
+        return cleaned_data
+
+    def get_emails(self) -> list[str]:
+        '''
+        Возвращает e-mail адреса статического списка
+        :return: список адресов без пустых строк и повторов
+        '''
+        emails = (line.strip() for line in self.cleaned_data['emails'].splitlines())
+
+        return list(dict.fromkeys(email for email in emails if email))
+
+
+class ClientImportForm(forms.Form):
+    '''
+    Форма импорта клиентов из CSV или JSONL файла
+    '''
+    file = forms.FileField(
+        label='Файл', help_text='CSV с колонками email, fullname, comment или JSONL с такими же полями'
+    )
+
+    def clean_file(self) -> UploadedFile:
+        file = self.cleaned_data['file']
+        self.file_format = get_import_format(file.name)
+
+        if self.file_format is None:
+            raise forms.ValidationError('Поддерживаются только файлы .csv и .jsonl')
+
+        return file
+
+
+class MailingLogsFilterForm(forms.Form):
+    '''
+    Форма фильтрации логов рассылок
+    '''
+    STATUS_CHOICES = (
+        ('', 'Все'),
+        ('1', 'OK'),
+        ('0', 'ERROR'),
+    )
+
+    status = forms.ChoiceField(choices=STATUS_CHOICES, required=False, label='Статус')
+    mailing = forms.ModelChoiceField(queryset=Mailing.objects.none(), required=False, label='Рассылка')
+    date_from = forms.DateField(required=False, label='С даты',
+                                widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, label='По дату',
+                              widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.user = kwargs.pop('user')
+
+        super().__init__(*args, **kwargs)
+        self.fields['mailing'].queryset = Mailing.objects.filter(user=self.user).only('pk', 'title')
+
+    def filter_queryset(self, queryset: QuerySet) -> QuerySet:
+        '''
+        Применяет заполненные фильтры к логам рассылок
+        :param queryset: QuerySet логов рассылок
+        :return: отфильтрованный QuerySet
+        '''
+        if not self.is_valid():
+            return queryset
+
+        status = self.cleaned_data['status']
+        mailing = self.cleaned_data['mailing']
+        date_from = self.cleaned_data['date_from']
+        date_to = self.cleaned_data['date_to']
+
+        if status:
+            queryset = queryset.filter(status=status == '1')
+        if mailing:
+            queryset = queryset.filter(mailing=mailing)
+        # границы дат переводятся во время, чтобы фильтр шел по индексу attempt_datetime
+        if date_from:
+            queryset = queryset.filter(
+                attempt_datetime__gte=timezone.make_aware(datetime.combine(date_from, time.min))
+            )
+        if date_to:
+            queryset = queryset.filter(
+                attempt_datetime__lt=timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+            )
+
+        return queryset
@@ -0,0 +1,160 @@
+import json
+import os
+import resource
+import tempfile
+import time
+
+from django.core.management import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+
+from mailings import cron
+from mailings.bench import (
+    BENCH_CACHES, QueryRecorder, SMTPSink, create_bench_database, destroy_bench_database, percentile, seed_dispatch_data
+)
+from mailings.models import Mailing, MailingDelivery
+from mailings.services.lookups import STATUS_CREATED
+
+
+class Command(BaseCommand):
+    '''
+    Команда нагрузочного теста отправки рассылок. Создает тестовую базу
+    данных с mailings рассылками по clients клиентов, запускает локальный
+    SMTP-сервер и отправляет все рассылки через cron_send_email. Выводит
+    количество писем в секунду, p50/p99 времени отправки одной рассылки,
+    количество запросов к базе данных на одно письмо и пиковую память процесса
+    '''
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--mailings', type=int, default=100, help='Количество рассылок')
+        parser.add_argument('--clients', type=int, default=100, help='Количество клиентов одного пользователя')
+        parser.add_argument('--users', type=int, default=10, help='Количество пользователей')
+        parser.add_argument('--latency', type=float, default=0.0, help='Задержка SMTP-сервера на письмо, сек.')
+        parser.add_argument('--fail-rate', type=float, default=0.0, help='Доля отклоняемых получателей')
+        parser.add_argument('--drop-rate', type=float, default=0.0, help='Доля писем, после которых рвется соединение')
+        parser.add_argument('--workers', type=int, help='Количество потоков отправки')
+        parser.add_argument('--per-user', type=int, help='Рассылок одного пользователя одновременно')
+        parser.add_argument('--pool-size', type=int, help='Количество SMTP-соединений')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора ошибок')
+        parser.add_argument('--output', help='Файл для сохранения результатов в JSON')
+        parser.add_argument('--keepdb', action='store_true', help='Не удалять тестовую базу данных')
+
+    def handle(self, *args, **options) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir, override_settings(CACHES=BENCH_CACHES):
+            # потоки отправки работают с базой данных параллельно, SQLite в памяти для этого не подходит
+            if connection.vendor == 'sqlite':
+                connection.settings_dict['TEST']['NAME'] = os.path.join(tmp_dir, 'bench_dispatch.sqlite3')
+
+            old_name = create_bench_database(options['keepdb'])
+
+            try:
+                self.stdout.write('Заполнение базы данных...')
+                expected = seed_dispatch_data(options['mailings'], options['clients'], options['users'])
+
+                with SMTPSink(options['latency'], options['fail_rate'], options['drop_rate'], options['seed']) as sink:
+                    with override_settings(**self.__get_settings(sink.port, options)):
+                        self.stdout.write(f'Отправка {expected} писем...')
+                        results = self.__dispatch()
+
+                    results['smtp'] = dict(sink.stats)
+            finally:
+                destroy_bench_database(old_name, options['keepdb'])
+
+        results['options'] = {
+            name: options[name] for name in (
+                'mailings', 'clients', 'users', 'latency', 'fail_rate', 'drop_rate', 'workers', 'per_user',
+                'pool_size', 'seed'
+            )
+        }
+        results['vendor'] = connection.vendor
+        self.__report(results)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def __get_settings(port: int, options) -> dict[str, object]:
+        overrides = {
+            'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+            'EMAIL_HOST': '127.0.0.1',
+            'EMAIL_PORT': port,
+            'EMAIL_USE_SSL': False,
+            'EMAIL_USE_TLS': False,
+            'EMAIL_HOST_USER': 'bench@example.com',
+            'EMAIL_HOST_PASSWORD': '',
+        }
+        names = {
+            'workers': 'MAILING_DISPATCH_WORKERS',
+            'per_user': 'MAILING_DISPATCH_PER_USER',
+            'pool_size': 'EMAIL_CONNECTION_POOL_SIZE',
+        }
+
+        for option, setting in names.items():
+            if options[option]:
+                overrides[setting] = options[option]
+
+        return overrides
+
+    @staticmethod
+    def __dispatch() -> dict[str, object]:
+        recorder = QueryRecorder()
+        durations = []
+        send_mailing = cron.send_mailing
+
+        def add_recorder(sender, connection, **kwargs) -> None:
+            connection.execute_wrappers.append(recorder)
+
+        def timed_send_mailing(*args, **kwargs) -> None:
+            start = time.perf_counter()
+
+            try:
+                send_mailing(*args, **kwargs)
+            finally:
+                durations.append(time.perf_counter() - start)
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        connection_created.connect(add_recorder)
+        connection.execute_wrappers.append(recorder)
+        cron.send_mailing = timed_send_mailing
+        start = time.perf_counter()
+
+        try:
+            cron.cron_send_email()
+        finally:
+            elapsed = time.perf_counter() - start
+            cron.send_mailing = send_mailing
+            connection.execute_wrappers.remove(recorder)
+            connection_created.disconnect(add_recorder)
+
+        messages = MailingDelivery.objects.count()
+        sent = MailingDelivery.objects.filter(status=MailingDelivery.STATUS_SENT).count()
+
+        return {
+            'seconds': round(elapsed, 3),
+            'messages': messages,
+            'sent': sent,
+            'messages_per_second': round(messages / elapsed, 1) if elapsed else 0.0,
+            'mailings_sent': len(durations),
+            'mailings_left': Mailing.objects.filter(status__name=STATUS_CREATED).count(),
+            'mailing_p50_ms': round(percentile(durations, 50) * 1000, 1),
+            'mailing_p99_ms': round(percentile(durations, 99) * 1000, 1),
+            'queries': recorder.count,
+            'queries_per_message': round(recorder.count / messages, 3) if messages else 0.0,
+            'db_seconds': round(recorder.time, 3),
+            'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            'peak_rss_before_kb': rss_before,
+        }
+
+    def __report(self, results: dict[str, object]) -> None:
+        self.stdout.write(
+            f'Писем: {results["messages"]} (доставлено {results["sent"]}) за {results["seconds"]} сек. - '
+            f'{results["messages_per_second"]} писем/сек.\n'
+            f'Рассылок: {results["mailings_sent"]}, не отправлено: {results["mailings_left"]}, '
+            f'время рассылки p50: {results["mailing_p50_ms"]} мс, p99: {results["mailing_p99_ms"]} мс\n'
+            f'Запросов к БД: {results["queries"]} ({results["queries_per_message"]} на письмо), '
+            f'время в БД: {results["db_seconds"]} сек.\n'
+            f'Пиковая память: {results["peak_rss_kb"]} КБ (до отправки {results["peak_rss_before_kb"]} КБ)\n'
+            f'SMTP: {results["smtp"]}'
+        )
@@ -0,0 +1,94 @@
+import tempfile
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from mailings.bench import (
+    BENCH_CACHES, create_bench_database, create_role_users, destroy_bench_database, find_regressions, load_baseline,
+    run_routes, save_baseline, seed_scale_data
+)
+
+
+class Command(BaseCommand):
+    '''
+    Команда нагрузочного теста всех страниц сервиса. Создает тестовую базу
+    данных, загружает database_data.json и синтетические данные, запрашивает
+    каждый маршрут mailings, users и blog от имени каждой роли и сохраняет
+    количество запросов, время в базе данных, время рендеринга шаблонов и
+    общее время ответа в JSON. Если количество запросов какой-либо страницы
+    выросло по сравнению с сохраненными результатами - команда завершается
+    с ошибкой
+    '''
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--users', type=int, default=10000, help='Количество пользователей')
+        parser.add_argument('--clients', type=int, default=1000000, help='Количество клиентов')
+        parser.add_argument('--mailings', type=int, default=100000, help='Количество рассылок')
+        parser.add_argument('--logs', type=int, default=100000, help='Количество логов рассылок')
+        parser.add_argument('--articles', type=int, default=50, help='Количество статей блога')
+        parser.add_argument('--repeat', type=int, default=3, help='Количество запросов к каждой странице')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'bench_routes.json'),
+                            help='Файл с сохраненными результатами')
+        parser.add_argument('--update', action='store_true', help='Перезаписать сохраненные результаты')
+        parser.add_argument('--keepdb', action='store_true', help='Не удалять тестовую базу данных')
+
+    def handle(self, *args, **options) -> None:
+        setup_test_environment()
+
+        with override_settings(CACHES=BENCH_CACHES):
+            old_name = create_bench_database(options['keepdb'])
+
+            try:
+                with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+                    results = self.__run(options)
+            finally:
+                destroy_bench_database(old_name, options['keepdb'])
+                teardown_test_environment()
+
+        self.__report(results, options)
+
+    def __run(self, options) -> dict[str, dict]:
+        self.stdout.write('Заполнение базы данных...')
+        samples = seed_scale_data(
+            options['users'], options['clients'], options['mailings'], options['logs'], options['articles']
+        )
+        roles = create_role_users()
+        roles['service_users'] = samples['owner']
+
+        self.stdout.write('Запросы к страницам...')
+        return run_routes(samples, roles, options['repeat'])
+
+    def __report(self, results: dict[str, dict], options) -> None:
+        for key, metrics in results.items():
+            self.stdout.write(
+                f'{key:<50} {metrics["status"]:>4} запросов: {metrics["queries"]:>3}/{metrics["warm_queries"]:<3} '
+                f'БД: {metrics["db_ms"]:>8} мс шаблоны: {metrics["render_ms"]:>8} мс '
+                f'всего: {metrics["wall_ms"]:>8} мс'
+            )
+
+        baseline = load_baseline(options['baseline'])
+        meta = {
+            'vendor': connection.vendor,
+            'date': timezone.now().isoformat(),
+            'scale': {name: options[name] for name in ('users', 'clients', 'mailings', 'logs', 'articles')},
+        }
+
+        if baseline is None or options['update']:
+            save_baseline(options['baseline'], results, meta)
+            self.stdout.write(f'Результаты сохранены в {options["baseline"]}')
+            return
+
+        if baseline['meta'].get('vendor') != meta['vendor']:
+            self.stderr.write(
+                f'Результаты сохранены для {baseline["meta"].get("vendor")}, текущая база - {meta["vendor"]}'
+            )
+
+        regressions = find_regressions(results, baseline)
+
+        if regressions:
+            raise CommandError('Выросло количество запросов:\n' + '\n'.join(regressions))
+
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
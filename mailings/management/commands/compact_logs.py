@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from mailings.services.logs import compact_mailing_logs
+
+
+class Command(BaseCommand):
+    '''
+    Команда для сворачивания старых логов рассылок в суточные сводки
+    '''
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--days', type=int, default=settings.MAILING_LOGS_RETENTION_DAYS,
+                            help='Сколько последних дней логов не сворачивать')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Количество логов, обрабатываемых в одной транзакции')
+
+    def handle(self, *args, **options) -> None:
+        deleted = compact_mailing_logs(options['days'], options['chunk_size'])
+        self.stdout.write(f'Свернуто и удалено логов: {deleted}')
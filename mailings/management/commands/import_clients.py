@@ -0,0 +1,43 @@
+from django.core.management import BaseCommand, CommandError
+
+from mailings.services.imports import CLIENT_IMPORT_FORMATS, get_import_format, import_clients
+
+from users.models import User
+
+
+class Command(BaseCommand):
+    '''
+    Команда для импорта клиентов пользователя из CSV или JSONL файла
+    '''
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('email', help='E-mail пользователя сервиса')
+        parser.add_argument('path', help='Путь к файлу')
+        parser.add_argument('--format', choices=CLIENT_IMPORT_FORMATS,
+                            help='Формат файла, по умолчанию определяется по расширению')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Количество строк в одной порции')
+
+    def handle(self, *args, **options) -> None:
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(f'Пользователь {options["email"]} не найден')
+
+        file_format = options['format'] or get_import_format(options['path'])
+
+        if file_format is None:
+            raise CommandError('Не удалось определить формат файла, укажите --format')
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as file:
+            report = import_clients(user, file, file_format, options['chunk_size'], self.__progress)
+
+        for line_num, reason in report['errors']:
+            self.stderr.write(f'Строка {line_num}: {reason}')
+
+        self.stdout.write(
+            f'Строк: {report["rows"]}, добавлено: {report["created"]}, '
+            f'уже существуют: {report["duplicates"]}, отклонено: {report["invalid"]}'
+        )
+
+    def __progress(self, report: dict) -> None:
+        self.stdout.write(f'Обработано строк: {report["rows"]}, добавлено: {report["created"]}')
@@ -5,7 +5,7 @@ from django.utils import timezone
 
 from mailings.cron import cron_send_email
 from mailings.models import Mailing
-from mailings.services import get_status_object
+from mailings.services.lookups import STATUS_FINISHED, get_status_object
 from users.models import User
 
 
@@ -60,7 +60,7 @@ class Command(BaseCommand):
         :param user: пользователь сервиса
         :return: list[Mailing]
         '''
-        mailings = Mailing.objects.filter(Q(user=user) & ~Q(status=get_status_object('завершена')))
+        mailings = Mailing.objects.filter(Q(user=user) & ~Q(status=get_status_object(STATUS_FINISHED)))
         mailing_dict = {num: mailing for num, mailing in enumerate(mailings, start=1)}
 
         self.stdout.write('Рассылки:')
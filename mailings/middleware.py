@@ -0,0 +1,20 @@
+from django.http import HttpRequest, HttpResponse
+from django.utils.functional import SimpleLazyObject
+
+from mailings.services.access import get_user_groups
+
+
+class UserGroupsMiddleware:
+    '''
+    Добавляет в запрос request.user_groups - имена групп текущего
+    пользователя. Группы загружаются при первом обращении один раз
+    за запрос и используются представлениями и фильтром has_group
+    '''
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        request.user_groups = SimpleLazyObject(lambda: get_user_groups(request.user))
+
+        return self.get_response(request)
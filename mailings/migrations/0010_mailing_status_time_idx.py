@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailings', '0009_alter_mailing_slug_alter_mailing_title'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mailing',
+            index=models.Index(fields=['status', 'sending_time'], name='mailing_status_time_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailings', '0010_mailing_status_time_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailing',
+            name='claimed_by',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Обработчик'),
+        ),
+        migrations.AddField(
+            model_name='mailing',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Захвачена до'),
+        ),
+    ]
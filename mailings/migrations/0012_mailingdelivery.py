@@ -0,0 +1,55 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailings', '0011_mailing_claim'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailingDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, verbose_name='E-mail')),
+                ('attempt_datetime', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время попытки')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'отправлено'), (2, 'временная ошибка'), (3, 'отклонено'), (4, 'ошибка соединения')], default=1, verbose_name='Статус доставки')),
+                ('smtp_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Код ответа сервера')),
+            ],
+            options={
+                'verbose_name': 'доставка рассылки',
+                'verbose_name_plural': 'доставки рассылки',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='mailinglogs',
+            index=models.Index(fields=['mailing', '-attempt_datetime'], name='mailinglogs_mailing_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='mailingdelivery',
+            name='client',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='mailings.client', verbose_name='Клиент'),
+        ),
+        migrations.AddField(
+            model_name='mailingdelivery',
+            name='mailing',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='mailings.mailing', verbose_name='Рассылка'),
+        ),
+        migrations.AddIndex(
+            model_name='mailingdelivery',
+            index=models.Index(fields=['mailing', '-attempt_datetime'], name='delivery_mailing_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mailingdelivery',
+            index=models.Index(fields=['mailing', 'status'], name='delivery_mailing_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mailingdelivery',
+            index=models.Index(fields=['attempt_datetime'], name='delivery_time_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailings', '0012_mailingdelivery'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mailinglogs',
+            index=models.Index(fields=['-attempt_datetime', '-id'], name='mailinglogs_time_id_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.4 on 2026-10-18 14:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailings', '0013_mailinglogs_time_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MailingLogsDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('successes', models.PositiveIntegerField(default=0, verbose_name='Успешных попыток')),
+                ('mailing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='mailings.mailing', verbose_name='Рассылка')),
+            ],
+            options={
+                'verbose_name': 'сводка логов рассылки',
+                'verbose_name_plural': 'сводки логов рассылки',
+                'unique_together': {('mailing', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.4 on 2026-10-18 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailings', '0014_mailinglogsdaily'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['user', 'email'], name='client_user_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['user', 'fullname'], name='client_user_fullname_idx'),
+        ),
+    ]
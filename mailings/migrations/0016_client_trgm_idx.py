@@ -0,0 +1,42 @@
+from django.db import migrations
+
+TRGM_INDEXES = (
+    ('client_email_trgm_idx', 'email'),
+    ('client_fullname_trgm_idx', 'fullname'),
+)
+
+
+def create_trgm_indexes(apps, schema_editor) -> None:
+    '''
+    Создает триграммные GIN-индексы для поиска клиентов по началу e-mail и ФИО.
+    Выражение индекса совпадает с SQL, который Django строит для istartswith.
+    На других базах данных используются обычные индексы из 0015
+    '''
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    for name, column in TRGM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON mailings_client USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trgm_indexes(apps, schema_editor) -> None:
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for name, column in TRGM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailings', '0015_client_search_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.4 on 2026-10-18 15:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('mailings', '0016_client_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Segment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('rule_field', models.CharField(blank=True, choices=[('email', 'E-mail'), ('fullname', 'ФИО'), ('comment', 'Комментарий')], max_length=20, null=True, verbose_name='Поле правила')),
+                ('rule_lookup', models.CharField(blank=True, choices=[('istartswith', 'начинается с'), ('iendswith', 'заканчивается на'), ('icontains', 'содержит'), ('iexact', 'равно')], max_length=20, null=True, verbose_name='Условие правила')),
+                ('rule_value', models.CharField(blank=True, max_length=254, null=True, verbose_name='Значение правила')),
+                ('clients', models.ManyToManyField(blank=True, related_name='segments', to='mailings.client', verbose_name='Клиенты')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь сервиса')),
+            ],
+            options={
+                'verbose_name': 'сегмент',
+                'verbose_name_plural': 'сегменты',
+            },
+        ),
+        migrations.AddField(
+            model_name='mailing',
+            name='segment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='mailings.segment', verbose_name='Сегмент'),
+        ),
+    ]
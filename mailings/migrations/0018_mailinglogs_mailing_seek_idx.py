@@ -0,0 +1,21 @@
+# Generated by Django 4.2.4 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mailings', '0017_segment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mailinglogs',
+            index=models.Index(fields=['mailing', '-attempt_datetime', '-id'], name='mailinglogs_mailing_seek_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='mailinglogs',
+            name='mailinglogs_mailing_time_idx',
+        ),
+    ]
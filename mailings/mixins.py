@@ -0,0 +1,172 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import redirect
+
+from typing import Any
+
+from mailings.services.versions import get_cache_version, get_list_version, get_object_version
+
+
+class ObjectAccessMixin:
+    '''
+    Миксин для представлений одного объекта пользователя. Объект загружается
+    из базы данных один раз за запрос вместе со связанными полями
+    related_fields и запоминается в представлении, после чего проверяется
+    доступ к нему. Миксин указывается после LoginRequiredMixin и
+    PermissionRequiredMixin, чтобы проверка объекта выполнялась только
+    для авторизованных пользователей с нужными правами
+    '''
+    related_fields: tuple[str, ...] = ()
+    denied_url: str = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        if self.related_fields:
+            queryset = queryset.select_related(*self.related_fields)
+
+        return queryset
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+
+        return self._object
+
+    def is_owner(self, obj) -> bool:
+        '''
+        Проверяет, что объект принадлежит текущему пользователю
+        :param obj: объект представления
+        :return: bool
+        '''
+        return obj.user_id == self.request.user.pk
+
+    def get_denied_url(self, obj) -> str | None:
+        '''
+        Возвращает адрес для перенаправления, если у пользователя нет доступа
+        к объекту, иначе None. По умолчанию доступ есть только у владельца
+        :param obj: объект представления
+        :return: адрес перенаправления или None
+        '''
+        if not self.is_owner(obj):
+            return self.denied_url
+
+        return None
+
+    def dispatch(self, request, *args, **kwargs) -> HttpResponse:
+        denied_url = self.get_denied_url(self.get_object())
+
+        if denied_url is not None:
+            return redirect(denied_url)
+
+        return super().dispatch(request, *args, **kwargs)
+
+
+class FragmentCacheMixin:
+    '''
+    Миксин кэширования фрагмента страницы тегом {% cache %} с версией
+    данных страницы. Версия читается из кэша в dispatch, до загрузки
+    данных, поэтому изменение, сохраненное во время запроса, сбросит
+    версию уже после чтения, и устаревший фрагмент не будет сохранен под
+    новой версией. Версии сбрасываются сигналами моделей. Миксин
+    указывается после миксинов проверки прав и перед миксином доступа
+    к объекту. По умолчанию версия хранится в кэше под ключом
+    fragment_version_key или, если он не задан, под ключом с именем класса
+    представления, и сбрасывается удалением этого ключа
+    '''
+    fragment_cache_ttl: int = None
+    fragment_version_key: str = None
+
+    def get_fragment_version(self) -> int:
+        '''
+        Возвращает версию данных страницы
+        :return: версия
+        '''
+        return get_cache_version(self.fragment_version_key or f'fragment_version_{type(self).__name__}')
+
+    def get_fragment_cache_ttl(self) -> int:
+        '''
+        Возвращает время жизни фрагмента в кэше
+        :return: время жизни, сек.
+        '''
+        return self.fragment_cache_ttl
+
+    def dispatch(self, request, *args, **kwargs) -> HttpResponse:
+        self.fragment_version = self.get_fragment_version() if settings.CACHE_ENABLED else None
+
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context['fragment_version'] = self.fragment_version
+        # без общего кэша фрагменты не сохраняются, версии из других процессов были бы неизвестны
+        context['fragment_cache_ttl'] = 0
+
+        if self.fragment_version is not None:
+            context['fragment_cache_ttl'] = self.get_fragment_cache_ttl()
+
+        return context
+
+
+class DetailCacheMixin(FragmentCacheMixin):
+    '''
+    Миксин кэширования фрагмента страницы объекта с версией объекта
+    '''
+
+    def get_fragment_version(self) -> int:
+        lookup = self.kwargs.get(self.pk_url_kwarg, self.kwargs.get(self.slug_url_kwarg))
+
+        return get_object_version(self.model, lookup)
+
+    def get_fragment_cache_ttl(self) -> int:
+        return self.fragment_cache_ttl or settings.DETAIL_CACHE_TTL
+
+
+class ListCacheMixin(FragmentCacheMixin):
+    '''
+    Миксин кэширования фрагмента страницы списка с версией списка. Список
+    читается только при рендеринге фрагмента, то есть при промахе кэша,
+    если представление передает его в контекст ленивым: QuerySet без
+    пагинации или SimpleLazyObject для списка, который строится не
+    QuerySet'ом. SimpleLazyObject передается в get_context_data вместе
+    с context_object_name, иначе ListView вычислит его, проверяя у списка
+    атрибут model. По умолчанию кэшируется список объектов текущего
+    пользователя, для общего списка list_cache_scope = LIST_SCOPE_ALL
+    '''
+    list_cache_scope: str = None
+
+    def get_fragment_version(self) -> int:
+        return get_list_version(self.model, self.list_cache_scope or self.request.user.pk)
+
+    def get_fragment_cache_ttl(self) -> int:
+        return self.fragment_cache_ttl or settings.LIST_CACHE_TTL
+
+
+class ClientAccessMixin(ObjectAccessMixin):
+    '''
+    Миксин доступа к клиенту - только для его владельца
+    '''
+    denied_url = 'mailings:client_list'
+
+
+class SegmentAccessMixin(ObjectAccessMixin):
+    '''
+    Миксин доступа к сегменту клиентов - только для его владельца
+    '''
+    denied_url = 'mailings:segment_list'
+
+
+class MailingAccessMixin(ObjectAccessMixin):
+    '''
+    Миксин доступа к рассылке. Владелец и менеджер имеют разный доступ
+    в зависимости от статуса рассылки, правила задаются в представлениях
+    '''
+    related_fields = ('user', 'status', 'regularity', 'segment')
+    denied_url = 'mailings:mailing_list'
+
+    @property
+    def is_manager(self) -> bool:
+        return 'manager' in self.request.user_groups
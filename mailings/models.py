@@ -22,6 +22,48 @@ class Client(models.Model):
         verbose_name = 'клиент'
         verbose_name_plural = 'клиенты'
         unique_together = ('email', 'user')
+        indexes = [
+            models.Index(fields=['user', 'email'], name='client_user_email_idx'),
+            models.Index(fields=['user', 'fullname'], name='client_user_fullname_idx'),
+        ]
+
+
+class Segment(models.Model):
+    '''
+    Модель сегмента клиентов - статического списка клиентов или правила
+    по полю клиента. Если правило задано, в сегмент входят все клиенты
+    пользователя, подходящие под правило, иначе - клиенты из списка
+    '''
+    RULE_FIELD_CHOICES = (
+        ('email', 'E-mail'),
+        ('fullname', 'ФИО'),
+        ('comment', 'Комментарий'),
+    )
+    RULE_LOOKUP_CHOICES = (
+        ('istartswith', 'начинается с'),
+        ('iendswith', 'заканчивается на'),
+        ('icontains', 'содержит'),
+        ('iexact', 'равно'),
+    )
+
+    name = models.CharField(max_length=100, verbose_name='Название')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Пользователь сервиса', **NULLABLE)
+    clients = models.ManyToManyField(Client, blank=True, related_name='segments', verbose_name='Клиенты')
+    rule_field = models.CharField(max_length=20, choices=RULE_FIELD_CHOICES, verbose_name='Поле правила', **NULLABLE)
+    rule_lookup = models.CharField(max_length=20, choices=RULE_LOOKUP_CHOICES, verbose_name='Условие правила',
+                                   **NULLABLE)
+    rule_value = models.CharField(max_length=254, verbose_name='Значение правила', **NULLABLE)
+
+    def __str__(self) -> str:
+        return f'{self.name}'
+
+    @property
+    def is_rule_based(self) -> bool:
+        return bool(self.rule_field and self.rule_lookup)
+
+    class Meta:
+        verbose_name = 'сегмент'
+        verbose_name_plural = 'сегменты'
 
 
 class MailingRegularity(models.Model):
@@ -64,6 +106,9 @@ class Mailing(models.Model):
                                    **NULLABLE)
     status = models.ForeignKey(MailingStatus, on_delete=models.CASCADE, verbose_name='Статус', **NULLABLE)
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Пользователь сервиса', **NULLABLE)
+    segment = models.ForeignKey(Segment, on_delete=models.PROTECT, verbose_name='Сегмент', **NULLABLE)
+    claimed_by = models.CharField(max_length=100, verbose_name='Обработчик', **NULLABLE)
+    claimed_until = models.DateTimeField(verbose_name='Захвачена до', **NULLABLE)
 
     def __str__(self) -> str:
         return f'{self.title}'
@@ -71,6 +116,9 @@ class Mailing(models.Model):
     class Meta:
         verbose_name = 'рассылка'
         verbose_name_plural = 'рассылки'
+        indexes = [
+            models.Index(fields=['status', 'sending_time'], name='mailing_status_time_idx'),
+        ]
 
 
 class MailingLogs(models.Model):
@@ -88,3 +136,63 @@ class MailingLogs(models.Model):
     class Meta:
         verbose_name = 'лог рассылки'
         verbose_name_plural = 'логи рассылки'
+        indexes = [
+            models.Index(fields=['mailing', '-attempt_datetime', '-id'], name='mailinglogs_mailing_seek_idx'),
+            models.Index(fields=['-attempt_datetime', '-id'], name='mailinglogs_time_id_idx'),
+        ]
+
+
+class MailingLogsDaily(models.Model):
+    '''
+    Модель суточной сводки логов рассылки
+    '''
+    mailing = models.ForeignKey(Mailing, on_delete=models.CASCADE, verbose_name='Рассылка')
+    date = models.DateField(verbose_name='Дата')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Попыток')
+    successes = models.PositiveIntegerField(default=0, verbose_name='Успешных попыток')
+
+    def __str__(self) -> str:
+        return f'{self.mailing_id} - {self.date}: {self.successes}/{self.attempts}'
+
+    class Meta:
+        verbose_name = 'сводка логов рассылки'
+        verbose_name_plural = 'сводки логов рассылки'
+        unique_together = ('mailing', 'date')
+
+
+class MailingDelivery(models.Model):
+    '''
+    Модель доставки рассылки одному получателю
+    '''
+    STATUS_SENT = 1
+    STATUS_DEFERRED = 2
+    STATUS_REJECTED = 3
+    STATUS_FAILED = 4
+
+    STATUS_CHOICES = (
+        (STATUS_SENT, 'отправлено'),
+        (STATUS_DEFERRED, 'временная ошибка'),
+        (STATUS_REJECTED, 'отклонено'),
+        (STATUS_FAILED, 'ошибка соединения'),
+    )
+
+    mailing = models.ForeignKey(Mailing, on_delete=models.CASCADE, verbose_name='Рассылка',
+                                related_name='deliveries')
+    client = models.ForeignKey(Client, on_delete=models.SET_NULL, verbose_name='Клиент', **NULLABLE)
+    email = models.EmailField(max_length=254, verbose_name='E-mail')
+    attempt_datetime = models.DateTimeField(default=timezone.now, verbose_name='Время попытки')
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=STATUS_SENT,
+                                              verbose_name='Статус доставки')
+    smtp_code = models.PositiveSmallIntegerField(verbose_name='Код ответа сервера', **NULLABLE)
+
+    def __str__(self) -> str:
+        return f'{self.email} - {self.get_status_display()}'
+
+    class Meta:
+        verbose_name = 'доставка рассылки'
+        verbose_name_plural = 'доставки рассылки'
+        indexes = [
+            models.Index(fields=['mailing', '-attempt_datetime'], name='delivery_mailing_time_idx'),
+            models.Index(fields=['mailing', 'status'], name='delivery_mailing_status_idx'),
+            models.Index(fields=['attempt_datetime'], name='delivery_time_idx'),
+        ]
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from typing import Iterable
+
+from users.models import User
+
+
+def check_user(user: User, current_user: User) -> bool:
+    '''
+    Функция проверяет, что пользователь объекта является
+    текущим, чтобы видеть страницу объекта, иначе переходит на другую
+    страницу
+    :param user: пользователь объекта
+    :param current_user: текущий пользователь
+    :return: bool
+    '''
+    return user == current_user
+
+
+def get_user_groups_cache_key(user_pk: int) -> str:
+    '''
+    Функция возвращает ключ кэша групп пользователя
+    :param user_pk: id пользователя
+    :return: ключ кэша
+    '''
+    return f'user_groups_{user_pk}'
+
+
+def get_user_groups(user: User) -> frozenset[str]:
+    '''
+    Функция возвращает имена групп пользователя. Группы загружаются
+    одним запросом и запоминаются в объекте пользователя, поэтому в
+    пределах одного запроса к сервису база данных опрашивается не более
+    одного раза. При включенном кэше имена групп хранятся в кэше до
+    изменения групп пользователя
+    :param user: пользователь
+    :return: множество имен групп
+    '''
+    if not user.is_authenticated:
+        return frozenset()
+
+    groups = getattr(user, '_group_names', None)
+
+    if groups is None:
+        if settings.CACHE_ENABLED:
+            cache_key = get_user_groups_cache_key(user.pk)
+            groups = cache.get(cache_key)
+
+            if groups is None:
+                groups = frozenset(user.groups.values_list('name', flat=True))
+                cache.set(cache_key, groups, 3600)
+        else:
+            groups = frozenset(user.groups.values_list('name', flat=True))
+
+        user._group_names = groups
+
+    return groups
+
+
+def invalidate_user_groups(user_pks: Iterable[int]) -> None:
+    '''
+    Функция удаляет из кэша группы переданных пользователей
+    :param user_pks: id пользователей
+    '''
+    cache.delete_many([get_user_groups_cache_key(pk) for pk in user_pks])
+
+
+def get_layout_cache_key(user: User) -> str:
+    '''
+    Функция возвращает ключ кэша меню и подвала страниц. Они зависят
+    только от групп пользователя и того, является ли он суперпользователем
+    :param user: пользователь
+    :return: ключ кэша
+    '''
+    if not user.is_authenticated:
+        return 'anonymous'
+
+    role = 'superuser' if user.is_superuser else 'user'
+
+    return f'{role}:{",".join(sorted(get_user_groups(user)))}'
@@ -0,0 +1,202 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.dispatch import Signal
+from django.utils import timezone
+
+import os
+import socket
+import uuid
+
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from mailings.models import Client, MailingDelivery, MailingStatus, Mailing
+from mailings.services.lookups import REGULARITY_PERIODS, STATUS_FINISHED, STATUS_RUNNING, get_status_object
+from mailings.services.segments import get_segment_clients
+from mailings.services.stats import invalidate_index_stats
+from mailings.services.versions import invalidate_mailing_versions
+
+from users.models import User
+
+# сигнал массовой смены статуса рассылок, аргументы: queryset, count, status, initiator
+mailings_status_changed = Signal()
+
+
+def change_mailings_status(queryset: QuerySet, status_name: str, initiator: User = None) -> int:
+    '''
+    Функция переводит все рассылки из queryset в переданный статус одним
+    UPDATE с условием queryset (например, UPDATE ... WHERE user_id = ...).
+    После фиксации транзакции отправляется один сигнал
+    mailings_status_changed с queryset и количеством измененных рассылок
+    :param queryset: QuerySet рассылок
+    :param status_name: имя нового статуса
+    :param initiator: пользователь, изменивший статус
+    :return: количество измененных рассылок
+    '''
+    status = get_status_object(status_name)
+    updated = queryset.exclude(status=status).update(status=status)
+
+    if updated:
+        transaction.on_commit(lambda: mailings_status_changed.send(
+            sender=Mailing, queryset=queryset, count=updated, status=status, initiator=initiator
+        ))
+
+    return updated
+
+
+def get_worker_name() -> str:
+    '''
+    Функция возвращает уникальное имя обработчика рассылок, по которому
+    рассылки захватываются на время отправки
+    :return: имя обработчика
+    '''
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def claim_due_mailings(now: datetime, statuses: list[MailingStatus], worker: str,
+                       batch_size: int = None) -> Iterator[list[Mailing]]:
+    '''
+    Функция порциями захватывает рассылки, время отправки которых уже
+    наступило. Выборка идет по индексу (status, sending_time) и пропускает
+    строки, заблокированные другими обработчиками, поэтому несколько
+    обработчиков получают непересекающиеся наборы рассылок. Захват действует
+    MAILING_LEASE_SECONDS секунд, после чего рассылку упавшего обработчика
+    может забрать другой
+    :param now: текущее время
+    :param statuses: статусы рассылок, которые необходимо отправить
+    :param worker: имя обработчика
+    :param batch_size: максимальный размер порции
+    :return: итератор порций захваченных рассылок
+    '''
+    batch_size = batch_size or settings.MAILING_DISPATCH_BATCH_SIZE
+    last_pk = 0
+
+    while True:
+        with transaction.atomic():
+            unclaimed = Q(claimed_until__isnull=True) | Q(claimed_until__lt=timezone.now())
+            pks = list(
+                Mailing.objects.select_for_update(skip_locked=True).filter(
+                    unclaimed, status__in=statuses, sending_time__lte=now, pk__gt=last_pk
+                ).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+
+            if not pks:
+                break
+
+            Mailing.objects.filter(unclaimed, pk__in=pks).update(
+                claimed_by=worker,
+                claimed_until=timezone.now() + timedelta(seconds=settings.MAILING_LEASE_SECONDS)
+            )
+
+        last_pk = pks[-1]
+        mailings = list(
+            Mailing.objects.filter(pk__in=pks, claimed_by=worker)
+            .select_related('regularity', 'user', 'segment')
+            .order_by('pk')
+        )
+
+        if mailings:
+            yield mailings
+
+
+class MailingLeaseLost(Exception):
+    '''
+    Захват рассылки потерян - её уже отправляет другой обработчик
+    '''
+
+
+def renew_mailing_lease(mailing: Mailing, worker: str) -> bool:
+    '''
+    Функция продлевает захват рассылки перед её отправкой и во время отправки
+    :param mailing: рассылка сервиса
+    :param worker: имя обработчика
+    :return: bool - False, если рассылку уже захватил другой обработчик
+    '''
+    claimed_until = timezone.now() + timedelta(seconds=settings.MAILING_LEASE_SECONDS)
+    renewed = Mailing.objects.filter(pk=mailing.pk, claimed_by=worker).update(claimed_until=claimed_until)
+
+    if renewed:
+        mailing.claimed_until = claimed_until
+
+    return bool(renewed)
+
+
+def release_mailing_lease(mailing: Mailing) -> None:
+    '''
+    Функция освобождает захват рассылки, не изменяя остальные поля
+    :param mailing: рассылка сервиса
+    '''
+    Mailing.objects.filter(pk=mailing.pk, claimed_by=mailing.claimed_by).update(claimed_by=None, claimed_until=None)
+
+
+def complete_mailing_send(mailing: Mailing) -> bool:
+    '''
+    Функция переводит отправленную рассылку на следующий срок отправки и
+    освобождает её захват одним условным UPDATE. Следующий срок всегда
+    позже текущего времени. Рассылка обновляется, только
+    если её захват, статус и время отправки не изменились с момента захвата,
+    иначе изменения другого обработчика или пользователя (например, остановка
+    рассылки при блокировке владельца) сохраняются, а захват освобождается,
+    если он еще принадлежит обработчику. UPDATE не отправляет post_save,
+    поэтому кэш сбрасывается явно
+    :param mailing: захваченная рассылка сервиса
+    :return: bool - False, если рассылка изменилась во время отправки
+    '''
+    if mailing.regularity_id:
+        # изменение статуса рассылки на "запущена" и увелечение даты следующей отправки
+        status = get_status_object(STATUS_RUNNING)
+        period = REGULARITY_PERIODS.get(mailing.regularity.name, timedelta(days=30))
+        sending_time = mailing.sending_time + period
+        now = timezone.now()
+
+        # пропущенные сроки не отправляются подряд, иначе доставки этой попытки попали бы в следующую
+        while sending_time <= now:
+            sending_time += period
+    else:
+        status = get_status_object(STATUS_FINISHED)
+        sending_time = mailing.sending_time
+
+    updated = Mailing.objects.filter(
+        pk=mailing.pk, claimed_by=mailing.claimed_by, status_id=mailing.status_id, sending_time=mailing.sending_time
+    ).update(status=status, sending_time=sending_time, claimed_by=None, claimed_until=None)
+
+    if not updated:
+        release_mailing_lease(mailing)
+        return False
+
+    mailing.status = status
+    mailing.sending_time = sending_time
+    mailing.claimed_by = None
+    mailing.claimed_until = None
+    invalidate_index_stats()
+    invalidate_mailing_versions([(mailing.slug, mailing.user_id)])
+
+    return True
+
+
+def get_mailing_recipients(mailing: Mailing) -> QuerySet:
+    '''
+    Функция возвращает получателей рассылки - клиентов её сегмента
+    или всех клиентов пользователя, если сегмент не выбран
+    :param mailing: рассылка сервиса
+    :return: QuerySet клиентов
+    '''
+    if mailing.segment_id:
+        return get_segment_clients(mailing.segment)
+
+    return Client.objects.filter(user_id=mailing.user_id)
+
+
+def get_attempt_deliveries(mailing: Mailing) -> QuerySet:
+    '''
+    Функция возвращает доставки текущей попытки рассылки - начиная с её
+    времени отправки, кроме неудачных из-за ошибки соединения. Получателям
+    этих доставок письмо уже отправлено, при повторной отправке после сбоя
+    они пропускаются
+    :param mailing: рассылка сервиса
+    :return: QuerySet доставок
+    '''
+    return MailingDelivery.objects.filter(
+        mailing_id=mailing.pk, attempt_datetime__gte=mailing.sending_time
+    ).exclude(status=MailingDelivery.STATUS_FAILED)
@@ -0,0 +1,113 @@
+import csv
+import json
+import zlib
+
+from typing import Iterable, Iterator
+
+from mailings.models import Client, MailingDelivery
+
+from users.models import User
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+
+class _EchoBuffer:
+    '''
+    Буфер для csv.writer, который возвращает записанную строку вместо сохранения
+    '''
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_export_lines(fields: tuple[str, ...], rows: Iterable[tuple], file_format: str) -> Iterator[str]:
+    '''
+    Функция переводит строки выгрузки в строки CSV-файла с заголовком
+    или JSONL-файла
+    :param fields: имена колонок
+    :param rows: строки выгрузки
+    :param file_format: csv или jsonl
+    :return: генератор строк файла
+    '''
+    if file_format == 'csv':
+        writer = csv.writer(_EchoBuffer())
+        yield writer.writerow(fields)
+
+        for row in rows:
+            yield writer.writerow(row)
+
+        return
+
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), ensure_ascii=False, default=str) + '\n'
+
+
+def iter_export_bytes(lines: Iterable[str], compress: bool = False) -> Iterator[bytes]:
+    '''
+    Функция кодирует строки выгрузки и отдает их блоками по EXPORT_BUFFER_SIZE
+    байт, при compress=True - сжатыми в формате gzip
+    :param lines: строки файла
+    :param compress: сжимать ли выгрузку
+    :return: генератор блоков файла
+    '''
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = []
+    size = 0
+
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+
+        if size >= EXPORT_BUFFER_SIZE:
+            data = b''.join(buffer)
+            buffer = []
+            size = 0
+
+            if compressor is not None:
+                data = compressor.compress(data)
+
+            if data:
+                yield data
+
+    data = b''.join(buffer)
+
+    if compressor is not None:
+        data = compressor.compress(data) + compressor.flush()
+
+    if data:
+        yield data
+
+
+def get_clients_export(user: User) -> tuple[tuple[str, ...], Iterator[tuple]]:
+    '''
+    Функция возвращает клиентов пользователя для выгрузки. Клиенты читаются
+    порциями серверным курсором, поэтому память не зависит от их количества
+    :param user: пользователь сервиса
+    :return: пара (имена колонок, генератор строк)
+    '''
+    fields = ('email', 'fullname', 'comment')
+    rows = Client.objects.filter(user=user).order_by('pk').values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    return fields, rows
+
+
+def get_deliveries_export(user: User) -> tuple[tuple[str, ...], Iterator[tuple]]:
+    '''
+    Функция возвращает доставки рассылок пользователя для выгрузки.
+    Доставки читаются порциями серверным курсором
+    :param user: пользователь сервиса
+    :return: пара (имена колонок, генератор строк)
+    '''
+    fields = ('mailing', 'email', 'attempt_datetime', 'status', 'smtp_code')
+    statuses = dict(MailingDelivery.STATUS_CHOICES)
+    deliveries = MailingDelivery.objects.filter(mailing__user=user).order_by('-attempt_datetime', '-pk').values_list(
+        'mailing__title', 'email', 'attempt_datetime', 'status', 'smtp_code'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    rows = (
+        (title, email, attempt_datetime.isoformat(), statuses.get(status, status), smtp_code)
+        for title, email, attempt_datetime, status, smtp_code in deliveries
+    )
+
+    return fields, rows
@@ -0,0 +1,152 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+import csv
+import json
+import os
+
+from typing import Callable, Iterable, Iterator
+
+from mailings.models import Client
+from mailings.services.segments import invalidate_segment_sizes
+from mailings.services.stats import invalidate_index_stats
+from mailings.services.versions import invalidate_list_versions
+
+from users.models import User
+
+CLIENT_IMPORT_FORMATS = ('csv', 'jsonl')
+CLIENT_IMPORT_MAX_ERRORS = 100
+
+
+def get_import_format(filename: str) -> str | None:
+    '''
+    Функция определяет формат файла импорта клиентов по его расширению
+    :param filename: имя файла
+    :return: csv, jsonl или None, если формат не поддерживается
+    '''
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+
+    if extension == 'json':
+        extension = 'jsonl'
+
+    return extension if extension in CLIENT_IMPORT_FORMATS else None
+
+
+def iter_import_rows(lines: Iterable[str], file_format: str) -> Iterator[tuple[int, dict | None]]:
+    '''
+    Функция построчно читает файл импорта клиентов, не загружая его в память.
+    CSV-файл должен содержать заголовок с колонками email, fullname и
+    необязательной comment, JSONL-файл - по одному объекту на строку
+    :param lines: строки файла
+    :param file_format: csv или jsonl
+    :return: генератор пар (номер строки, данные строки или None, если строку не удалось разобрать)
+    '''
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+
+        for row in reader:
+            yield reader.line_num, row
+
+        return
+
+    for line_num, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+
+        yield line_num, row if isinstance(row, dict) else None
+
+
+def import_clients(user: User, lines: Iterable[str], file_format: str, chunk_size: int = 1000,
+                   progress: Callable[[dict], None] = None) -> dict[str, object]:
+    '''
+    Функция импортирует клиентов пользователя из CSV или JSONL файла порциями
+    по chunk_size строк. E-mail адреса порции проверяются без обращения к
+    базе данных, существующие клиенты порции находятся одним запросом, новые
+    клиенты сохраняются одним bulk_create. Порции импортов одного
+    пользователя выполняются по очереди под блокировкой строки
+    пользователя, поэтому клиенты, добавленные другим импортом, считаются
+    дубликатами, а не созданными обоими импортами
+    :param user: пользователь сервиса
+    :param lines: строки файла
+    :param file_format: csv или jsonl
+    :param chunk_size: размер порции
+    :param progress: функция, которая вызывается с текущими итогами после каждой порции
+    :return: итоги импорта - rows, created, duplicates, invalid и errors (первые ошибки строк)
+    '''
+    report = {'rows': 0, 'created': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+
+    def reject(line_num: int, reason: str) -> None:
+        report['invalid'] += 1
+
+        if len(report['errors']) < CLIENT_IMPORT_MAX_ERRORS:
+            report['errors'].append((line_num, reason))
+
+    def flush(chunk: dict[str, Client]) -> None:
+        emails = list(chunk)
+
+        with transaction.atomic():
+            list(User.objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+            existing = set(Client.objects.filter(user=user, email__in=emails).values_list('email', flat=True))
+            clients = [client for email, client in chunk.items() if email not in existing]
+            Client.objects.bulk_create(clients, ignore_conflicts=True)
+            # bulk_create с ignore_conflicts не сообщает, какие строки пропущены - считаются строки после вставки
+            created = Client.objects.filter(user=user, email__in=emails).count() - len(existing)
+
+        report['created'] += created
+        report['duplicates'] += len(chunk) - created
+
+        if progress is not None:
+            progress(report)
+
+    chunk = {}
+
+    for line_num, row in iter_import_rows(lines, file_format):
+        report['rows'] += 1
+
+        if row is None:
+            reject(line_num, 'строка не разобрана')
+            continue
+
+        email = str(row.get('email') or '').strip()
+        fullname = str(row.get('fullname') or '').strip()
+        comment = str(row.get('comment') or '').strip() or None
+
+        try:
+            validate_email(email)
+
+            if len(email) > Client._meta.get_field('email').max_length:
+                raise ValidationError('e-mail слишком длинный')
+        except ValidationError:
+            reject(line_num, f'некорректный e-mail "{email}"')
+            continue
+
+        if not fullname or len(fullname) > Client._meta.get_field('fullname').max_length:
+            reject(line_num, 'ФИО не указано или длиннее 100 символов')
+            continue
+
+        if email in chunk:
+            report['duplicates'] += 1
+            continue
+
+        chunk[email] = Client(email=email, fullname=fullname, comment=comment, user=user)
+
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = {}
+
+    if chunk:
+        flush(chunk)
+
+    if report['created']:
+        # bulk_create не отправляет post_save
+        invalidate_index_stats()
+        invalidate_segment_sizes(user.pk)
+        invalidate_list_versions(Client, [user.pk])
+
+    return report
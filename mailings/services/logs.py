@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from collections import Counter
+from datetime import datetime, time as datetime_time, timedelta
+
+from mailings.models import MailingDelivery, MailingLogs, MailingLogsDaily
+
+from users.models import User
+
+
+def purge_expired_deliveries(chunk_size: int = 1000) -> int:
+    '''
+    Функция удаляет доставки рассылок старше MAILING_DELIVERY_RETENTION_DAYS
+    дней. Удаление идет небольшими порциями по индексу времени попытки,
+    чтобы не блокировать таблицу надолго
+    :param chunk_size: размер порции
+    :return: количество удаленных записей
+    '''
+    if not settings.MAILING_DELIVERY_RETENTION_DAYS:
+        return 0
+
+    border = timezone.now() - timedelta(days=settings.MAILING_DELIVERY_RETENTION_DAYS)
+    deleted = 0
+
+    while True:
+        pks = list(
+            MailingDelivery.objects.filter(attempt_datetime__lt=border)
+            .order_by('attempt_datetime').values_list('pk', flat=True)[:chunk_size]
+        )
+
+        if not pks:
+            return deleted
+
+        deleted += MailingDelivery.objects.filter(pk__in=pks).delete()[0]
+
+
+def compact_mailing_logs(days: int = None, chunk_size: int = 1000) -> int:
+    '''
+    Функция сворачивает логи рассылок старше days дней в суточные сводки
+    MailingLogsDaily и удаляет свернутые логи. Логи обрабатываются небольшими
+    порциями, каждая в своей короткой транзакции, поэтому таблица не
+    блокируется и команду можно запускать на работающем сервисе. Строки
+    порции блокируются (SELECT FOR UPDATE SKIP LOCKED), и сводки
+    увеличиваются, только если DELETE удалил все строки порции, поэтому
+    одновременные запуски не учитывают один лог дважды
+    :param days: сколько последних дней логов не сворачивать
+    :param chunk_size: размер порции
+    :return: количество удаленных логов
+    '''
+    days = settings.MAILING_LOGS_RETENTION_DAYS if days is None else days
+    border = timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=days), datetime_time.min))
+    deleted = 0
+
+    while True:
+        with transaction.atomic():
+            logs = list(
+                MailingLogs.objects.select_for_update(skip_locked=True).filter(attempt_datetime__lt=border)
+                .order_by('attempt_datetime').values_list('pk', 'mailing_id', 'attempt_datetime', 'status')[:chunk_size]
+            )
+
+            if not logs:
+                return deleted
+
+            removed = MailingLogs.objects.filter(pk__in=[log[0] for log in logs]).delete()[0]
+
+            if removed != len(logs):
+                # часть порции уже свернул другой запуск - порция читается заново
+                transaction.set_rollback(True)
+                continue
+
+            attempts = Counter()
+            successes = Counter()
+
+            for pk, mailing_id, attempt_datetime, status in logs:
+                key = (mailing_id, timezone.localdate(attempt_datetime))
+                attempts[key] += 1
+                successes[key] += 1 if status else 0
+
+            MailingLogsDaily.objects.bulk_create(
+                [MailingLogsDaily(mailing_id=mailing_id, date=date) for mailing_id, date in attempts],
+                ignore_conflicts=True
+            )
+
+            # все сводки порции увеличиваются одним UPDATE
+            groups = {key: Q(mailing_id=key[0], date=key[1]) for key in attempts}
+            condition = Q()
+
+            for group in groups.values():
+                condition |= group
+
+            MailingLogsDaily.objects.filter(condition).update(
+                attempts=F('attempts') + Case(
+                    *(When(group, then=Value(attempts[key])) for key, group in groups.items()), default=Value(0)
+                ),
+                successes=F('successes') + Case(
+                    *(When(group, then=Value(successes[key])) for key, group in groups.items()), default=Value(0)
+                )
+            )
+            deleted += removed
+
+
+def get_mailing_logs_summary(user: User) -> dict[str, int]:
+    '''
+    Функция возвращает количество всех, успешных и неудачных попыток
+    рассылок пользователя с учетом свернутых в суточные сводки логов
+    :param user: пользователь сервиса
+    :return: словарь с количеством попыток
+    '''
+    logs = MailingLogs.objects.filter(mailing__user=user).aggregate(
+        attempts=Count('pk'), successes=Count('pk', filter=Q(status=True))
+    )
+    daily = MailingLogsDaily.objects.filter(mailing__user=user).aggregate(
+        attempts=Sum('attempts'), successes=Sum('successes')
+    )
+    attempts = logs['attempts'] + (daily['attempts'] or 0)
+    successes = logs['successes'] + (daily['successes'] or 0)
+
+    return {'attempts': attempts, 'successes': successes, 'failures': attempts - successes}
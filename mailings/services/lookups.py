@@ -0,0 +1,110 @@
+from django.conf import settings
+
+import threading
+import time
+
+from datetime import timedelta
+
+from mailings.models import MailingRegularity, MailingStatus, Mailing
+
+STATUS_CREATED = 'создана'
+STATUS_RUNNING = 'запущена'
+STATUS_FINISHED = 'завершена'
+
+REGULARITY_DAILY = 'раз в день'
+REGULARITY_WEEKLY = 'раз в неделю'
+REGULARITY_MONTHLY = 'раз в месяц'
+
+# срок до следующей отправки рассылки по её переодичности
+REGULARITY_PERIODS = {
+    REGULARITY_DAILY: timedelta(days=1),
+    REGULARITY_WEEKLY: timedelta(days=7),
+    REGULARITY_MONTHLY: timedelta(days=30),
+}
+
+
+class LookupRegistry:
+    '''
+    Процессный кэш справочника (статусы, переодичности рассылок). Таблица
+    загружается одним запросом при первом обращении и хранится в памяти
+    процесса. Кэш сбрасывается сигналами post_save/post_delete справочника,
+    а изменения из других процессов подхватываются по истечении LOOKUP_CACHE_TTL
+    '''
+
+    def __init__(self, model: type[MailingStatus | MailingRegularity]) -> None:
+        self.model = model
+        self.__objects = None
+        self.__loaded_at = 0.0
+        self.__lock = threading.Lock()
+
+    def __load(self) -> dict[str, MailingStatus | MailingRegularity]:
+        with self.__lock:
+            if self.__objects is None or time.monotonic() - self.__loaded_at > settings.LOOKUP_CACHE_TTL:
+                self.__objects = {obj.name: obj for obj in self.model.objects.all()}
+                self.__loaded_at = time.monotonic()
+
+            return self.__objects
+
+    def get(self, name: str) -> MailingStatus | MailingRegularity | None:
+        '''
+        Возвращает объект справочника по имени
+        :param name: имя объекта
+        :return: объект справочника или None
+        '''
+        objects = self.__objects
+
+        if objects is None or time.monotonic() - self.__loaded_at > settings.LOOKUP_CACHE_TTL:
+            objects = self.__load()
+
+        return objects.get(name)
+
+    def invalidate(self) -> None:
+        '''
+        Сбрасывает кэш справочника
+        '''
+        with self.__lock:
+            self.__objects = None
+
+
+mailing_statuses = LookupRegistry(MailingStatus)
+mailing_regularities = LookupRegistry(MailingRegularity)
+
+
+def get_status_object(status_name: str) -> MailingStatus:
+    '''
+    Функция возвращает объект класса MailingStatus по переданному имени
+    :param status_name: имя статуса
+    :return: MailingStatus objects
+    '''
+    status = mailing_statuses.get(status_name)
+
+    if status is None:
+        print(f'Ошибка - статус "{status_name}" не найден')
+
+    return status
+
+
+def get_regularity_object(regularity_name: str) -> MailingRegularity:
+    '''
+    Функция возвращает объект класса MailingRegularity по переданному имени
+    :param regularity_name: имя переодичности
+    :return: MailingRegularity objects
+    '''
+    regularity = mailing_regularities.get(regularity_name)
+
+    if regularity is None:
+        print(f'Ошибка - переодичность "{regularity_name}" не найдена')
+
+    return regularity
+
+
+def check_mailing_status(mailing: Mailing, status_name: str) -> bool:
+    '''
+    Функция проверят, что статус рассылки равен переданому
+    :param mailing: рассылка сервиса
+    :param status_name: имя статуса
+    :return: bool
+    '''
+    status = get_status_object(status_name)
+
+    return status is not None and mailing.status_id == status.pk
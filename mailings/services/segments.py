@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+
+from typing import Iterable
+
+from mailings.models import Client, Segment
+from mailings.services.utils import iter_batches
+from mailings.services.versions import get_cache_version
+
+
+def get_segment_clients(segment: Segment) -> QuerySet:
+    '''
+    Функция возвращает клиентов сегмента. Для сегмента с правилом клиенты
+    пользователя отбираются по правилу, для статического сегмента - по списку
+    :param segment: сегмент клиентов
+    :return: QuerySet клиентов
+    '''
+    clients = Client.objects.filter(user_id=segment.user_id)
+
+    if segment.is_rule_based:
+        return clients.filter(**{f'{segment.rule_field}__{segment.rule_lookup}': segment.rule_value or ''})
+
+    return clients.filter(segments=segment)
+
+
+def get_segment_sizes_version_key(user_pk: int) -> str:
+    '''
+    Функция возвращает ключ кэша версии размеров сегментов пользователя
+    :param user_pk: id пользователя
+    :return: ключ кэша
+    '''
+    return f'segment_sizes_version_{user_pk}'
+
+
+def get_segment_size(segment: Segment) -> int:
+    '''
+    Функция возвращает количество клиентов сегмента. При включенном кэше
+    размер каждого сегмента хранится под своим ключом с версией размеров
+    сегментов пользователя SEGMENT_SIZE_CACHE_TTL секунд или до изменения
+    клиентов и сегментов пользователя. Размер, посчитанный до сброса версии,
+    сохраняется под прежней версией и больше не читается
+    :param segment: сегмент клиентов
+    :return: количество клиентов
+    '''
+    if not settings.CACHE_ENABLED:
+        return get_segment_clients(segment).count()
+
+    version = get_cache_version(get_segment_sizes_version_key(segment.user_id))
+    cache_key = f'segment_size_{segment.pk}_{version}'
+    size = cache.get(cache_key)
+
+    if size is None:
+        size = get_segment_clients(segment).count()
+        cache.set(cache_key, size, settings.SEGMENT_SIZE_CACHE_TTL)
+
+    return size
+
+
+def invalidate_segment_sizes(user_pk: int) -> None:
+    '''
+    Функция сбрасывает кэш размеров сегментов пользователя
+    :param user_pk: id пользователя
+    '''
+    if settings.CACHE_ENABLED:
+        cache.delete(get_segment_sizes_version_key(user_pk))
+
+
+def set_segment_clients(segment: Segment, emails: Iterable[str], chunk_size: int = 1000) -> int:
+    '''
+    Функция заменяет список клиентов статического сегмента клиентами
+    пользователя с переданными e-mail адресами. Адреса обрабатываются
+    порциями, связи сохраняются bulk_create
+    :param segment: сегмент клиентов
+    :param emails: e-mail адреса клиентов
+    :param chunk_size: размер порции
+    :return: количество клиентов в сегменте
+    '''
+    through = Segment.clients.through
+
+    with transaction.atomic():
+        through.objects.filter(segment=segment).delete()
+
+        for chunk in iter_batches(emails, chunk_size):
+            client_pks = Client.objects.filter(user_id=segment.user_id, email__in=chunk).values_list('pk', flat=True)
+            through.objects.bulk_create(
+                [through(segment=segment, client_id=pk) for pk in client_pks], ignore_conflicts=True
+            )
+
+    invalidate_segment_sizes(segment.user_id)
+
+    return through.objects.filter(segment=segment).count()
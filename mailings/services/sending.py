@@ -0,0 +1,195 @@
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.core.mail.backends.base import BaseEmailBackend
+
+import queue
+import smtplib
+import threading
+
+from typing import Iterable
+
+from mailings.models import MailingDelivery
+
+from users.models import User
+
+
+def send_email(title: str, body: str, users_email_list: list[User]) -> None:
+    '''
+    Функция отправляет e-mail сообщение на указанную почту/ы
+    :param title: имя сообщения
+    :param body: тело сообщения
+    :param users_email_list: список e-mail адресов получателей
+    '''
+    try:
+        send_mail(
+            title,
+            body,
+            settings.EMAIL_HOST_USER,
+            users_email_list,
+            fail_silently=False
+        )
+    except Exception as e:
+        print(
+            'Ошибка отправки\n'
+            f'Ошибка: {e}'
+        )
+
+
+class SMTPConnectionPool:
+    '''
+    Пул переиспользуемых SMTP-соединений. Соединение открывается один раз и
+    отправляет несколько писем подряд, после max_messages писем оно
+    закрывается и заменяется новым. При обрыве соединения письмо
+    отправляется повторно через новое соединение
+    '''
+
+    def __init__(self, size: int = None, max_messages: int = None) -> None:
+        self.size = size or settings.EMAIL_CONNECTION_POOL_SIZE
+        self.max_messages = max_messages or settings.EMAIL_MESSAGES_PER_CONNECTION
+        self.__idle = queue.LifoQueue()
+        self.__slots = threading.BoundedSemaphore(self.size)
+
+    def __open(self) -> BaseEmailBackend:
+        connection = get_connection(fail_silently=False)
+        connection.open()
+        connection.sent_messages = 0
+
+        return connection
+
+    def __acquire(self) -> BaseEmailBackend:
+        self.__slots.acquire()
+        try:
+            return self.__idle.get_nowait()
+        except queue.Empty:
+            try:
+                return self.__open()
+            except Exception:
+                self.__slots.release()
+                raise
+
+    def __release(self, connection: BaseEmailBackend | None) -> None:
+        if connection is not None:
+            if connection.sent_messages < self.max_messages:
+                self.__idle.put(connection)
+            else:
+                connection.close()
+
+        self.__slots.release()
+
+    def send(self, message: EmailMessage) -> None:
+        '''
+        Отправляет одно письмо через свободное соединение пула
+        :param message: письмо
+        '''
+        connection = self.__acquire()
+        try:
+            try:
+                connection.send_messages([message])
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                # соединение оборвалось - переподключение и повторная отправка письма
+                connection.close()
+                connection = self.__open()
+                connection.send_messages([message])
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException):
+            # ошибка относится к самому письму, соединение остается рабочим
+            raise
+        except Exception:
+            connection.close()
+            connection = None
+            raise
+        finally:
+            if connection is not None:
+                connection.sent_messages += 1
+            self.__release(connection)
+
+    def close(self) -> None:
+        '''
+        Закрывает все свободные соединения пула
+        '''
+        while True:
+            try:
+                self.__idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+# ошибки, которые относятся к самому письму, а не к доступности SMTP-сервера
+SMTP_MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+class SMTPUnavailableError(Exception):
+    '''
+    SMTP-сервер недоступен - подряд не удалось отправить
+    EMAIL_MAX_CONNECTION_ERRORS писем. В results хранятся
+    результаты писем, отправленных до остановки
+    '''
+
+    def __init__(self, error: Exception, results: list[tuple[str, Exception | None]]) -> None:
+        super().__init__(f'SMTP-сервер недоступен: {error}')
+        self.results = results
+
+
+def send_bulk_email(title: str, body: str, recipients: Iterable[str],
+                    pool: SMTPConnectionPool = None) -> list[tuple[str, Exception | None]]:
+    '''
+    Функция отправляет отдельное письмо каждому получателю, чтобы адреса
+    получателей не были видны друг другу. Письма отправляются через пул
+    SMTP-соединений. Если подряд EMAIL_MAX_CONNECTION_ERRORS писем не
+    отправлены из-за ошибки соединения, отправка останавливается, чтобы
+    не ждать отказа сервера для каждого оставшегося получателя
+    :param title: имя сообщения
+    :param body: тело сообщения
+    :param recipients: e-mail адреса получателей
+    :param pool: пул SMTP-соединений, если не передан - создается на время отправки
+    :return: список пар (e-mail адрес, ошибка отправки или None)
+    :raises SMTPUnavailableError: если SMTP-сервер недоступен
+    '''
+    own_pool = pool is None
+    pool = pool or SMTPConnectionPool()
+    results = []
+    connection_errors = 0
+
+    try:
+        for email in recipients:
+            message = EmailMessage(title, body, settings.EMAIL_HOST_USER, [email])
+            try:
+                pool.send(message)
+                results.append((email, None))
+                connection_errors = 0
+            except SMTP_MESSAGE_ERRORS as e:
+                results.append((email, e))
+                connection_errors = 0
+            except Exception as e:
+                results.append((email, e))
+                connection_errors += 1
+
+                if connection_errors >= settings.EMAIL_MAX_CONNECTION_ERRORS:
+                    raise SMTPUnavailableError(e, results)
+    finally:
+        if own_pool:
+            pool.close()
+
+    return results
+
+
+def get_delivery_status(error: Exception | None) -> tuple[int, int | None]:
+    '''
+    Функция переводит результат отправки письма в статус доставки
+    и код ответа SMTP-сервера
+    :param error: ошибка отправки или None
+    :return: пара (статус доставки, код ответа сервера)
+    '''
+    if error is None:
+        return MailingDelivery.STATUS_SENT, 250
+
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        smtp_code = next(iter(error.recipients.values()), (None,))[0]
+    else:
+        smtp_code = getattr(error, 'smtp_code', None)
+
+    if not isinstance(smtp_code, int) or smtp_code < 400:
+        return MailingDelivery.STATUS_FAILED, None
+
+    if smtp_code < 500:
+        return MailingDelivery.STATUS_DEFERRED, smtp_code
+
+    return MailingDelivery.STATUS_REJECTED, smtp_code
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, QuerySet
+
+from mailings.models import Client, Mailing
+from mailings.services.lookups import STATUS_CREATED, STATUS_FINISHED, STATUS_RUNNING, get_status_object
+
+
+def annotate_mailing_counters(queryset: QuerySet) -> QuerySet:
+    '''
+    Функция добавляет к пользователям количество всех, созданных, запущенных
+    и завершенных рассылок. Счетчики считаются одним запросом вместе с выборкой
+    пользователей
+    :param queryset: QuerySet пользователей
+    :return: QuerySet пользователей со счетчиками рассылок
+    '''
+    return queryset.annotate(
+        total_mailings=Count('mailing'),
+        created_mailings=Count('mailing', filter=Q(mailing__status=get_status_object(STATUS_CREATED))),
+        running_mailings=Count('mailing', filter=Q(mailing__status=get_status_object(STATUS_RUNNING))),
+        finished_mailings=Count('mailing', filter=Q(mailing__status=get_status_object(STATUS_FINISHED))),
+    )
+
+INDEX_STATS_CACHE_KEY = 'index_stats'
+
+
+def get_index_stats() -> dict[str, int]:
+    '''
+    Функция возвращает статистику сервиса для главной страницы: количество
+    всех и активных рассылок и уникальных клиентов. Статистика считается
+    агрегатными запросами в базе данных и хранится в кэше INDEX_STATS_CACHE_TTL
+    секунд или до изменения рассылок и клиентов
+    :return: словарь со статистикой
+    '''
+    if settings.CACHE_ENABLED:
+        stats = cache.get(INDEX_STATS_CACHE_KEY)
+
+        if stats is None:
+            stats = compute_index_stats()
+            cache.set(INDEX_STATS_CACHE_KEY, stats, settings.INDEX_STATS_CACHE_TTL)
+
+        return stats
+
+    return compute_index_stats()
+
+
+def compute_index_stats() -> dict[str, int]:
+    '''
+    Функция считает статистику сервиса для главной страницы
+    :return: словарь со статистикой
+    '''
+    stats = Mailing.objects.aggregate(
+        total_mailings=Count('pk'),
+        active_mailings=Count('pk', filter=~Q(status=get_status_object(STATUS_FINISHED)))
+    )
+    stats.update(Client.objects.aggregate(unique_clients=Count('email', distinct=True)))
+
+    return stats
+
+
+def invalidate_index_stats() -> None:
+    '''
+    Функция сбрасывает кэш статистики главной страницы
+    '''
+    if settings.CACHE_ENABLED:
+        cache.delete(INDEX_STATS_CACHE_KEY)
@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import Q, QuerySet
+
+import time
+
+from typing import Iterable, Iterator
+
+
+class BulkCreateBuffer:
+    '''
+    Буфер записей модели для пакетной вставки. Записи накапливаются в памяти
+    и сохраняются одним bulk_create, когда их становится batch_size или с
+    первой несохраненной записи прошло flush_interval секунд. Срок проверяется
+    при добавлении записи и в flush_if_due, которую владелец буфера вызывает,
+    пока новых записей нет. При выходе из блока with, в том числе по
+    исключению, оставшиеся записи сохраняются
+    '''
+
+    def __init__(self, model: type[models.Model], batch_size: int = None, flush_interval: float = None) -> None:
+        self.model = model
+        self.batch_size = batch_size or settings.MAILING_LOGS_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.MAILING_LOGS_FLUSH_INTERVAL
+        self.__objects = []
+        self.__first_added_at = None
+
+    def __enter__(self) -> 'BulkCreateBuffer':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.flush()
+
+    def add(self, **fields) -> None:
+        '''
+        Добавляет запись в буфер
+        :param fields: поля записи
+        '''
+        if not self.__objects:
+            self.__first_added_at = time.monotonic()
+
+        self.__objects.append(self.model(**fields))
+
+        if len(self.__objects) >= self.batch_size:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self) -> int:
+        '''
+        Сохраняет накопленные записи, если первая из них ждет
+        сохранения flush_interval секунд или дольше
+        :return: количество сохраненных записей
+        '''
+        if self.__objects and time.monotonic() - self.__first_added_at >= self.flush_interval:
+            return self.flush()
+
+        return 0
+
+    def flush(self) -> int:
+        '''
+        Сохраняет накопленные записи в базу данных
+        :return: количество сохраненных записей
+        '''
+        objects, self.__objects = self.__objects, []
+        self.__first_added_at = None
+
+        if objects:
+            self.model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+        return len(objects)
+
+
+def get_keyset_page(queryset: QuerySet, ordering: tuple[str, ...], cursor: str | None,
+                    per_page: int) -> tuple[list, str | None]:
+    '''
+    Функция возвращает страницу объектов с пагинацией по ключу (seek-пагинация).
+    Вместо OFFSET следующая страница начинается сразу после последнего объекта
+    предыдущей, поэтому стоимость запроса не зависит от номера страницы, если
+    ordering совпадает с индексом
+    :param queryset: QuerySet объектов
+    :param ordering: поля сортировки, последнее поле должно быть уникальным
+    :param cursor: курсор страницы или None для первой страницы
+    :param per_page: количество объектов на странице
+    :return: пара (объекты страницы, курсор следующей страницы или None)
+    '''
+    fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in ordering]
+    queryset = queryset.order_by(*ordering)
+
+    if cursor:
+        try:
+            values = [field.to_python(value) for field, value in zip(fields, signing.loads(cursor, salt='keyset'))]
+        except (signing.BadSignature, ValidationError, TypeError):
+            values = None
+
+        if values:
+            # (a < a0) OR (a = a0 AND b < b0) OR ...
+            condition = Q()
+            for num, name in enumerate(ordering):
+                lookup = 'lt' if name.startswith('-') else 'gt'
+                previous = {ordering[i].lstrip('-'): values[i] for i in range(num)}
+                condition |= Q(**previous, **{f'{name.lstrip("-")}__{lookup}': values[num]})
+
+            queryset = queryset.filter(condition)
+
+    objects = list(queryset[:per_page + 1])
+    next_cursor = None
+
+    if len(objects) > per_page:
+        objects = objects[:per_page]
+        next_cursor = signing.dumps([field.value_to_string(objects[-1]) for field in fields], salt='keyset')
+
+    return objects, next_cursor
+
+
+def iter_batches(objects: Iterable, batch_size: int) -> Iterator[list]:
+    '''
+    Функция разбивает поток объектов на порции
+    :param objects: объекты
+    :param batch_size: размер порции
+    :return: генератор порций
+    '''
+    batch = []
+
+    for obj in objects:
+        batch.append(obj)
+
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
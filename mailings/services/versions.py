@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+
+import time
+
+from typing import Iterable
+
+from mailings.models import Mailing
+
+from users.models import User
+
+# область версии общего списка объектов всех пользователей
+LIST_SCOPE_ALL = 'all'
+
+
+def get_cache_version(key: str) -> int:
+    '''
+    Функция возвращает версию из кэша для ключей кэша фрагментов страниц.
+    Новая версия начинается с текущего времени, поэтому после сброса
+    версии прежние фрагменты больше не используются
+    :param key: ключ кэша версии
+    :return: версия
+    '''
+    version = cache.get(key)
+
+    if version is None:
+        version = time.time_ns() // 1000
+
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+
+    return version
+
+
+def get_object_version_key(model: type[models.Model], lookup: int | str) -> str:
+    '''
+    Функция возвращает ключ кэша версии объекта
+    :param model: модель объекта
+    :param lookup: значение, по которому объект ищется в адресе страницы (pk или slug)
+    :return: ключ кэша
+    '''
+    return f'version_{model._meta.label_lower}_{lookup}'
+
+
+def get_object_version(model: type[models.Model], lookup: int | str) -> int:
+    '''
+    Функция возвращает версию объекта для ключей кэша фрагментов его страницы
+    :param model: модель объекта
+    :param lookup: значение, по которому объект ищется в адресе страницы (pk или slug)
+    :return: версия объекта
+    '''
+    return get_cache_version(get_object_version_key(model, lookup))
+
+
+def invalidate_object_versions(model: type[models.Model], lookups: Iterable[int | str]) -> None:
+    '''
+    Функция сбрасывает версии объектов, после чего кэш фрагментов
+    их страниц перестает использоваться
+    :param model: модель объектов
+    :param lookups: значения, по которым объекты ищутся в адресах страниц
+    '''
+    if settings.CACHE_ENABLED:
+        cache.delete_many([get_object_version_key(model, lookup) for lookup in lookups if lookup is not None])
+
+
+def get_list_version_key(model: type[models.Model], scope: int | str) -> str:
+    '''
+    Функция возвращает ключ кэша версии списка объектов
+    :param model: модель объектов списка
+    :param scope: id пользователя для списка его объектов или LIST_SCOPE_ALL для общего списка
+    :return: ключ кэша
+    '''
+    return f'list_version_{model._meta.label_lower}_{scope}'
+
+
+def get_list_version(model: type[models.Model], scope: int | str) -> int:
+    '''
+    Функция возвращает версию списка объектов для ключей кэша фрагментов страницы списка
+    :param model: модель объектов списка
+    :param scope: id пользователя для списка его объектов или LIST_SCOPE_ALL для общего списка
+    :return: версия списка
+    '''
+    return get_cache_version(get_list_version_key(model, scope))
+
+
+def invalidate_list_versions(model: type[models.Model], scopes: Iterable[int | str]) -> None:
+    '''
+    Функция сбрасывает версии списков объектов
+    :param model: модель объектов списка
+    :param scopes: id пользователей и/или LIST_SCOPE_ALL
+    '''
+    if settings.CACHE_ENABLED:
+        cache.delete_many([get_list_version_key(model, scope) for scope in set(scopes) if scope is not None])
+
+
+def invalidate_mailing_versions(mailings: Iterable[tuple[str, int]]) -> None:
+    '''
+    Функция сбрасывает версии рассылок, списков рассылок их пользователей,
+    общего списка активных рассылок и списка пользователей со счетчиками рассылок
+    :param mailings: пары (slug, id пользователя) рассылок
+    '''
+    if not settings.CACHE_ENABLED:
+        return
+
+    mailings = list(mailings)
+    invalidate_object_versions(Mailing, [slug for slug, _ in mailings])
+    invalidate_list_versions(Mailing, [user_id for _, user_id in mailings] + [LIST_SCOPE_ALL])
+    invalidate_list_versions(User, [LIST_SCOPE_ALL])
@@ -0,0 +1,171 @@
+import logging
+
+from functools import partial
+
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from mailings.models import Client, Mailing, MailingRegularity, MailingStatus, Segment
+from mailings.services.access import invalidate_user_groups
+from mailings.services.dispatch import mailings_status_changed
+from mailings.services.lookups import mailing_regularities, mailing_statuses
+from mailings.services.segments import invalidate_segment_sizes
+from mailings.services.stats import invalidate_index_stats
+from mailings.services.versions import (
+    LIST_SCOPE_ALL, invalidate_list_versions, invalidate_mailing_versions, invalidate_object_versions
+)
+
+from users.models import User
+
+logger = logging.getLogger('mailings.audit')
+
+
+@receiver(post_save, sender=MailingStatus)
+@receiver(post_delete, sender=MailingStatus)
+def invalidate_mailing_statuses(sender, **kwargs) -> None:
+    '''
+    Сбрасывает кэш статусов рассылок при их изменении
+    '''
+    mailing_statuses.invalidate()
+
+
+@receiver(post_save, sender=MailingRegularity)
+@receiver(post_delete, sender=MailingRegularity)
+def invalidate_mailing_regularities(sender, **kwargs) -> None:
+    '''
+    Сбрасывает кэш переодичностей рассылок при их изменении
+    '''
+    mailing_regularities.invalidate()
+
+
+@receiver(post_save, sender=Mailing)
+@receiver(post_delete, sender=Mailing)
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def reset_index_stats(sender, **kwargs) -> None:
+    '''
+    Сбрасывает кэш статистики главной страницы при изменении рассылок и клиентов
+    '''
+    invalidate_index_stats()
+
+
+@receiver(mailings_status_changed, sender=Mailing)
+def audit_mailings_status_change(sender, queryset: QuerySet, count: int, status: MailingStatus, initiator=None,
+                                 **kwargs) -> None:
+    '''
+    Записывает в журнал массовую смену статуса рассылок и сбрасывает кэш
+    статистики главной страницы и версии рассылок и их списков, так как
+    UPDATE не отправляет post_save. В журнал и сброс версий попадают все
+    рассылки queryset в новом статусе, в том числе бывшие в нем до UPDATE
+    '''
+    mailings = list(queryset.filter(status=status).values_list('pk', 'slug', 'user_id'))
+    logger.info(
+        'Статус %s рассылок изменен на "%s" пользователем %s: %s',
+        count, status, getattr(initiator, 'email', None), [pk for pk, _, _ in mailings]
+    )
+    invalidate_index_stats()
+    invalidate_mailing_versions((slug, user_id) for _, slug, user_id in mailings)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def reset_user_groups(sender, instance, action: str, reverse: bool, pk_set: set[int] | None, **kwargs) -> None:
+    '''
+    Сбрасывает кэш групп пользователей при изменении user.groups или group.user_set
+    '''
+    if action not in ('post_add', 'post_remove', 'pre_clear', 'post_clear'):
+        return
+
+    if not reverse:
+        # изменены группы одного пользователя
+        instance.__dict__.pop('_group_names', None)
+        invalidate_user_groups([instance.pk])
+    elif action == 'pre_clear':
+        # из группы удаляются все пользователи, после удаления их уже не получить
+        invalidate_user_groups(instance.user_set.values_list('pk', flat=True))
+    elif pk_set:
+        invalidate_user_groups(pk_set)
+
+
+@receiver(post_save, sender=Group)
+def reset_renamed_group_members(sender, instance: Group, created: bool, **kwargs) -> None:
+    '''
+    Сбрасывает кэш групп участников группы при её изменении (например,
+    переименовании) после фиксации транзакции
+    '''
+    if not created:
+        transaction.on_commit(partial(invalidate_user_groups, list(instance.user_set.values_list('pk', flat=True))))
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_members(sender, instance: Group, **kwargs) -> None:
+    '''
+    Запоминает участников удаляемой группы. Связи с пользователями удаляются
+    каскадно без m2m_changed, после удаления их уже не получить
+    '''
+    instance._member_pks = list(instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def reset_deleted_group_members(sender, instance: Group, **kwargs) -> None:
+    '''
+    Сбрасывает кэш групп участников удаленной группы после фиксации транзакции
+    '''
+    transaction.on_commit(partial(invalidate_user_groups, getattr(instance, '_member_pks', [])))
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+@receiver(post_save, sender=Segment)
+@receiver(post_delete, sender=Segment)
+def reset_segment_sizes(sender, instance, **kwargs) -> None:
+    '''
+    Сбрасывает кэш размеров сегментов пользователя при изменении его клиентов и сегментов
+    '''
+    invalidate_segment_sizes(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Segment.clients.through)
+def reset_segment_sizes_on_members_change(sender, instance, action: str, **kwargs) -> None:
+    '''
+    Сбрасывает кэш размеров сегментов при изменении статического списка клиентов
+    '''
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_segment_sizes(instance.user_id)
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_delete, sender=Client)
+def reset_client_version(sender, instance: Client, **kwargs) -> None:
+    '''
+    Сбрасывает версии клиента и списка клиентов пользователя, чтобы
+    их страницы отображались заново
+    '''
+    invalidate_object_versions(Client, [instance.pk])
+    invalidate_list_versions(Client, [instance.user_id])
+
+
+@receiver(post_save, sender=Mailing)
+@receiver(post_delete, sender=Mailing)
+def reset_mailing_version(sender, instance: Mailing, **kwargs) -> None:
+    '''
+    Сбрасывает версии рассылки и её списков, чтобы их страницы отображались заново
+    '''
+    invalidate_mailing_versions([(instance.slug, instance.user_id)])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reset_user_list_versions(sender, instance: User, update_fields: frozenset | None = None, **kwargs) -> None:
+    '''
+    Сбрасывает версии списка пользователей и общего списка активных рассылок,
+    в котором выводятся e-mail авторов. Обновление только last_login при входе
+    пропускается
+    '''
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+
+    invalidate_list_versions(User, [LIST_SCOPE_ALL])
+    invalidate_list_versions(Mailing, [LIST_SCOPE_ALL])
@@ -1,6 +1,6 @@
 from django import template
-from django.conf import settings
-from django.core.cache import cache
+
+from mailings.services.access import get_user_groups
 
 from users.models import User
 
@@ -8,13 +8,19 @@ register = template.Library()
 
 
 @register.filter
-def mediapath(url: str) -> str:
+def mediapath(url, variant: str = None) -> str:
     '''
     Возвращает созданный путь к изображениям
-    в папке media
-    :param url: url изображения
+    в папке media. Для статьи блога возвращает путь
+    к её производному изображению variant (thumbnail,
+    full, webp), а пока оно не создано - к исходному
+    :param url: url изображения или статья блога
+    :param variant: вариант изображения статьи
     :return: созданный путь
     '''
+    if variant is not None and hasattr(url, 'get_image'):
+        url = url.get_image(variant)
+
     media_url = f'/media/{url}'
     return media_url
 
@@ -23,18 +29,10 @@ def mediapath(url: str) -> str:
 def has_group(user: User, group_name: str) -> bool:
     '''
     Возвращает True, в случае если пользователь относится
-    к определенной группе пользователей
+    к определенной группе пользователей. Группы пользователя
+    загружаются один раз за запрос
     :param user: пользователь
     :param group_name: имя группы
     :return: bool-значение
     '''
-    if settings.CACHE_ENABLED:
-        cache_key = f'user_belongs_{group_name}_{user.pk}'
-        users_group = cache.get(cache_key)
-        if users_group is None:
-            users_group = user.groups.filter(name=group_name).exists()
-            cache.set(cache_key, users_group, 3600)
-
-        return users_group
-
-    return user.groups.filter(name=group_name).exists()
+    return group_name in get_user_groups(user)
@@ -1 +1,585 @@
-from django.test import TestCase
+from django.contrib.auth.models import Permission
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+import gzip
+import json
+import time
+
+from datetime import timedelta
+from unittest import mock
+
+from mailings.cache import VersionedCache
+from mailings.cron import send_mailing
+from mailings.models import (
+    Client, Mailing, MailingDelivery, MailingLogs, MailingLogsDaily, MailingRegularity, MailingStatus, Segment
+)
+from mailings.services.dispatch import (
+    change_mailings_status, claim_due_mailings, get_mailing_recipients, renew_mailing_lease
+)
+from mailings.services.exports import iter_export_bytes
+from mailings.services.imports import import_clients
+from mailings.services.logs import compact_mailing_logs, get_mailing_logs_summary
+from mailings.services.lookups import (
+    REGULARITY_DAILY, STATUS_CREATED, STATUS_FINISHED, STATUS_RUNNING, get_status_object, mailing_regularities,
+    mailing_statuses
+)
+from mailings.services.segments import get_segment_clients, get_segment_size, set_segment_clients
+from mailings.services.utils import get_keyset_page
+from mailings.views import ClientListView
+
+from users.models import User
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'mailings-tests'}}
+
+
+class UnavailableEmailBackend(EmailBackend):
+    '''
+    Почтовый бэкенд, SMTP-сервер которого перестает отвечать после первого письма
+    '''
+
+    def send_messages(self, messages) -> int:
+        if mail.outbox:
+            raise ConnectionRefusedError('Connection refused')
+
+        return super().send_messages(messages)
+
+
+class SendMailingTestCase(TestCase):
+    '''
+    Тесты отправки рассылок: захват рассылок обработчиками, истечение
+    захвата, перехват рассылки другим обработчиком и повторная отправка
+    после сбоя
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        MailingStatus.objects.bulk_create([
+            MailingStatus(name=name) for name in (STATUS_CREATED, STATUS_RUNNING, STATUS_FINISHED)
+        ])
+        MailingRegularity.objects.create(name=REGULARITY_DAILY)
+        cls.user = User.objects.create(email='owner@example.com')
+        Client.objects.bulk_create([
+            Client(email=f'client{num}@example.com', fullname=f'Клиент {num}', user=cls.user) for num in range(3)
+        ])
+
+    def setUp(self) -> None:
+        mailing_statuses.invalidate()
+        mailing_regularities.invalidate()
+        self.mailing = Mailing.objects.create(
+            title='Рассылка', body='Текст', slug='mailing', user=self.user,
+            status=get_status_object(STATUS_CREATED), sending_time=timezone.now() - timedelta(minutes=1)
+        )
+
+    def claim(self, worker: str) -> list[Mailing]:
+        statuses = [get_status_object(STATUS_CREATED), get_status_object(STATUS_RUNNING)]
+
+        return [mailing for batch in claim_due_mailings(timezone.now(), statuses, worker) for mailing in batch]
+
+    def test_claimed_mailing_is_not_claimed_again(self) -> None:
+        self.assertEqual(len(self.claim('worker-1')), 1)
+        self.assertEqual(self.claim('worker-2'), [])
+
+    def test_expired_lease_is_taken_over(self) -> None:
+        mailing, = self.claim('worker-1')
+        Mailing.objects.filter(pk=mailing.pk).update(claimed_until=timezone.now() - timedelta(seconds=1))
+
+        taken, = self.claim('worker-2')
+
+        self.assertEqual(taken.claimed_by, 'worker-2')
+        self.assertFalse(renew_mailing_lease(mailing, 'worker-1'))
+
+    def test_send_completes_and_releases_lease(self) -> None:
+        mailing, = self.claim('worker-1')
+
+        send_mailing(mailing)
+
+        self.mailing.refresh_from_db()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(self.mailing.status.name, STATUS_FINISHED)
+        self.assertIsNone(self.mailing.claimed_by)
+
+    def test_regular_mailing_moves_to_next_period(self) -> None:
+        Mailing.objects.filter(pk=self.mailing.pk).update(regularity=mailing_regularities.get(REGULARITY_DAILY))
+        mailing, = self.claim('worker-1')
+
+        send_mailing(mailing)
+
+        self.mailing.refresh_from_db()
+        self.assertEqual(self.mailing.status.name, STATUS_RUNNING)
+        self.assertEqual(self.mailing.sending_time, mailing.sending_time)
+        self.assertGreater(self.mailing.sending_time, timezone.now())
+
+    @override_settings(MAILING_LEASE_SECONDS=0)
+    def test_send_stops_when_lease_is_lost(self) -> None:
+        mailing, = self.claim('worker-1')
+        Mailing.objects.filter(pk=mailing.pk).update(claimed_by='worker-2')
+
+        send_mailing(mailing)
+
+        self.mailing.refresh_from_db()
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(self.mailing.claimed_by, 'worker-2')
+        self.assertEqual(self.mailing.status.name, STATUS_CREATED)
+
+    def test_send_keeps_lease_taken_over_during_send(self) -> None:
+        mailing, = self.claim('worker-1')
+        # захват истек и перешел к другому обработчику, пока первый еще отправлял письма
+        Mailing.objects.filter(pk=mailing.pk).update(claimed_by='worker-2')
+
+        send_mailing(mailing)
+
+        self.mailing.refresh_from_db()
+        self.assertEqual(self.mailing.claimed_by, 'worker-2')
+        self.assertEqual(self.mailing.status.name, STATUS_CREATED)
+
+    def test_send_keeps_status_changed_during_send(self) -> None:
+        Mailing.objects.filter(pk=self.mailing.pk).update(regularity=mailing_regularities.get(REGULARITY_DAILY))
+        mailing, = self.claim('worker-1')
+        # владелец заблокирован во время отправки, его рассылки завершены одним UPDATE
+        change_mailings_status(Mailing.objects.filter(user=self.user), STATUS_FINISHED)
+
+        send_mailing(mailing)
+
+        self.mailing.refresh_from_db()
+        self.assertEqual(self.mailing.status.name, STATUS_FINISHED)
+        self.assertIsNone(self.mailing.claimed_by)
+
+    def test_status_change_is_one_update_and_audited(self) -> None:
+        finished = get_status_object(STATUS_FINISHED)
+        Mailing.objects.create(title='Завершенная', body='Текст', slug='finished', user=self.user, status=finished)
+
+        with self.assertLogs('mailings.audit', 'INFO') as logs, self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                updated = change_mailings_status(Mailing.objects.filter(user=self.user), STATUS_FINISHED)
+
+        self.assertEqual(updated, 1)
+        self.assertEqual([query['sql'].split()[0] for query in queries.captured_queries], ['UPDATE'])
+        self.assertIn('Статус 1 рассылок изменен на "завершена"', logs.output[0])
+        self.assertEqual(Mailing.objects.filter(status__name=STATUS_FINISHED).count(), 2)
+
+    def test_resend_skips_clients_delivered_in_this_attempt(self) -> None:
+        clients = list(Client.objects.filter(user=self.user).order_by('pk'))
+        MailingDelivery.objects.bulk_create([
+            MailingDelivery(mailing=self.mailing, client=clients[0], email=clients[0].email),
+            MailingDelivery(mailing=self.mailing, client=clients[1], email=clients[1].email,
+                            status=MailingDelivery.STATUS_FAILED),
+        ])
+        mailing, = self.claim('worker-1')
+
+        send_mailing(mailing)
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [clients[1].email, clients[2].email])
+
+    @override_settings(
+        EMAIL_BACKEND='mailings.tests.UnavailableEmailBackend', EMAIL_MAX_CONNECTION_ERRORS=2,
+        MAILING_SEND_CHUNK_SIZE=10
+    )
+    def test_send_stops_when_smtp_is_unavailable(self) -> None:
+        mailing, = self.claim('worker-1')
+
+        send_mailing(mailing)
+
+        self.mailing.refresh_from_db()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(self.mailing.status.name, STATUS_CREATED)
+        self.assertIsNone(self.mailing.claimed_by)
+        self.assertEqual(MailingDelivery.objects.filter(status=MailingDelivery.STATUS_SENT).count(), 1)
+        self.assertFalse(MailingLogs.objects.get(mailing=self.mailing).status)
+
+
+class CompactMailingLogsTestCase(TestCase):
+    '''
+    Тесты сворачивания старых логов рассылок в суточные сводки
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create(email='owner@example.com')
+        cls.mailing = Mailing.objects.create(title='Рассылка', body='Текст', slug='mailing', user=cls.user)
+
+    def add_logs(self, days_ago: int, statuses: list[bool]) -> None:
+        attempt_datetime = timezone.now() - timedelta(days=days_ago)
+        MailingLogs.objects.bulk_create([
+            MailingLogs(mailing=self.mailing, attempt_datetime=attempt_datetime, status=status) for status in statuses
+        ])
+
+    def test_old_logs_are_rolled_into_daily_summaries(self) -> None:
+        self.add_logs(40, [True, True, False])
+        self.add_logs(35, [True, False])
+        self.add_logs(1, [True])
+        summary = get_mailing_logs_summary(self.user)
+
+        self.assertEqual(compact_mailing_logs(days=30, chunk_size=2), 5)
+
+        self.assertEqual(MailingLogs.objects.count(), 1)
+        self.assertEqual(
+            sorted(MailingLogsDaily.objects.values_list('attempts', 'successes')), [(2, 1), (3, 2)]
+        )
+        self.assertEqual(get_mailing_logs_summary(self.user), summary)
+
+    def test_existing_summary_is_increased(self) -> None:
+        self.add_logs(40, [True])
+        compact_mailing_logs(days=30)
+        self.add_logs(40, [False, True])
+
+        compact_mailing_logs(days=30)
+
+        daily = MailingLogsDaily.objects.get()
+        self.assertEqual((daily.attempts, daily.successes), (3, 2))
+
+    def test_chunk_partly_removed_by_another_run_is_read_again(self) -> None:
+        self.add_logs(40, [True, True])
+        delete = QuerySet.delete
+        calls = []
+
+        def delete_after_another_run(queryset):
+            # первый DELETE находит одну строку порции уже удаленной другим запуском
+            if not calls:
+                calls.append(queryset)
+                MailingLogs.objects.filter(pk=queryset.first().pk)._raw_delete(queryset.db)
+
+            return delete(queryset)
+
+        with mock.patch.object(QuerySet, 'delete', autospec=True, side_effect=delete_after_another_run):
+            deleted = compact_mailing_logs(days=30)
+
+        daily = MailingLogsDaily.objects.get()
+        self.assertEqual(deleted, 2)
+        self.assertEqual((daily.attempts, daily.successes), (2, 2))
+
+
+class ImportClientsTestCase(TestCase):
+    '''
+    Тесты импорта клиентов: подсчет созданных клиентов, дубликатов и
+    некорректных строк
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create(email='owner@example.com')
+        Client.objects.create(email='old@example.com', fullname='Старый клиент', user=cls.user)
+
+    def test_csv_rows_are_counted(self) -> None:
+        lines = [
+            'email,fullname,comment\n',
+            'new@example.com,Новый клиент,\n',
+            'old@example.com,Старый клиент,\n',
+            'new@example.com,Новый клиент,\n',
+            'not-an-email,Клиент,\n',
+            'empty@example.com,,\n',
+        ]
+
+        report = import_clients(self.user, lines, 'csv')
+
+        self.assertEqual(
+            {key: report[key] for key in ('rows', 'created', 'duplicates', 'invalid')},
+            {'rows': 5, 'created': 1, 'duplicates': 2, 'invalid': 2}
+        )
+        self.assertEqual([line_num for line_num, _ in report['errors']], [5, 6])
+        self.assertEqual(Client.objects.filter(user=self.user).count(), 2)
+
+    def test_chunks_are_counted_against_earlier_chunks(self) -> None:
+        emails = ['a@example.com', 'b@example.com', 'old@example.com', 'a@example.com', 'c@example.com']
+        lines = [f'{{"email": "{email}", "fullname": "Клиент"}}\n' for email in emails] + ['[1, 2]\n']
+        reports = []
+
+        report = import_clients(self.user, lines, 'jsonl', chunk_size=2, progress=lambda report: reports.append(
+            (report['created'], report['duplicates'])
+        ))
+
+        self.assertEqual(reports, [(2, 0), (2, 2), (3, 2)])
+        self.assertEqual((report['rows'], report['invalid']), (6, 1))
+        self.assertEqual(Client.objects.filter(user=self.user).count(), 4)
+
+
+class ExportTestCase(TestCase):
+    '''
+    Тесты потоковой выгрузки клиентов и доставок в CSV, JSONL и gzip
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create(email='owner@example.com')
+        cls.user.user_permissions.add(*Permission.objects.filter(codename__in=['view_client', 'view_mailinglogs']))
+        other = User.objects.create(email='other@example.com')
+        Client.objects.bulk_create([
+            Client(email='first@example.com', fullname='Первый, клиент', user=cls.user),
+            Client(email='second@example.com', fullname='Второй клиент', comment='VIP', user=cls.user),
+            Client(email='foreign@example.com', fullname='Чужой клиент', user=other),
+        ])
+        mailing = Mailing.objects.create(title='Рассылка', body='Текст', slug='mailing', user=cls.user)
+        MailingDelivery.objects.create(
+            mailing=mailing, email='first@example.com', status=MailingDelivery.STATUS_REJECTED, smtp_code=550
+        )
+
+    def setUp(self) -> None:
+        self.client.force_login(self.user)
+
+    def get_export(self, url: str, **headers) -> tuple[object, bytes]:
+        response = self.client.get(url, **headers)
+
+        return response, b''.join(response.streaming_content)
+
+    def test_clients_csv_contains_only_own_clients(self) -> None:
+        response, content = self.get_export(reverse('mailings:client_export'))
+
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="clients.csv"')
+        self.assertEqual(content.decode().splitlines(), [
+            'email,fullname,comment',
+            'first@example.com,"Первый, клиент",',
+            'second@example.com,Второй клиент,VIP',
+        ])
+
+    def test_gzip_export_matches_plain_export(self) -> None:
+        url = reverse('mailings:client_export') + '?format=jsonl'
+        _, plain = self.get_export(url)
+
+        response, compressed = self.get_export(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(compressed), plain)
+
+    def test_deliveries_jsonl_uses_status_names(self) -> None:
+        _, content = self.get_export(reverse('mailings:delivery_export') + '?format=jsonl')
+
+        delivery, = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(
+            (delivery['mailing'], delivery['status'], delivery['smtp_code']), ('Рассылка', 'отклонено', 550)
+        )
+
+    def test_export_is_sent_in_blocks(self) -> None:
+        lines = [f'line {num}\n' for num in range(1000)]
+
+        with mock.patch('mailings.services.exports.EXPORT_BUFFER_SIZE', 1024):
+            blocks = list(iter_export_bytes(lines))
+            compressed = list(iter_export_bytes(lines, compress=True))
+
+        self.assertGreater(len(blocks), 1)
+        self.assertTrue(all(len(block) < 1100 for block in blocks))
+        self.assertEqual(b''.join(blocks), ''.join(lines).encode())
+        self.assertEqual(gzip.decompress(b''.join(compressed)), b''.join(blocks))
+
+
+class SegmentTestCase(TestCase):
+    '''
+    Тесты состава сегментов клиентов: правило, статический список,
+    переходы между ними и кэш размеров сегментов
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create(email='owner@example.com')
+        cls.user.user_permissions.add(Permission.objects.get(codename='change_client'))
+        other = User.objects.create(email='other@example.com')
+        Client.objects.bulk_create([
+            Client(email='ann@corp.com', fullname='Анна', user=cls.user),
+            Client(email='bob@corp.com', fullname='Борис', user=cls.user),
+            Client(email='eve@mail.com', fullname='Ева', user=cls.user),
+            Client(email='zed@corp.com', fullname='Чужой', user=other),
+        ])
+
+    def setUp(self) -> None:
+        self.segment = Segment.objects.create(name='Сегмент', user=self.user)
+
+    def get_emails(self, clients) -> list[str]:
+        return sorted(clients.values_list('email', flat=True))
+
+    def update(self, **data) -> None:
+        data = {'name': self.segment.name, 'rule_field': '', 'rule_lookup': '', 'rule_value': '', 'emails': '', **data}
+        self.client.force_login(self.user)
+        self.client.post(reverse('mailings:segment_update', args=[self.segment.pk]), data)
+        self.segment.refresh_from_db()
+
+    def test_rule_selects_only_own_matching_clients(self) -> None:
+        self.segment.rule_field, self.segment.rule_lookup, self.segment.rule_value = 'email', 'iendswith', '@CORP.com'
+
+        self.assertEqual(self.get_emails(get_segment_clients(self.segment)), ['ann@corp.com', 'bob@corp.com'])
+
+    def test_static_list_keeps_only_own_clients(self) -> None:
+        emails = ['eve@mail.com', 'zed@corp.com', 'unknown@mail.com', 'ann@corp.com']
+
+        self.assertEqual(set_segment_clients(self.segment, emails, chunk_size=1), 2)
+        self.assertEqual(self.get_emails(get_segment_clients(self.segment)), ['ann@corp.com', 'eve@mail.com'])
+
+    def test_mailing_without_segment_goes_to_all_own_clients(self) -> None:
+        set_segment_clients(self.segment, ['eve@mail.com'])
+        mailing = Mailing.objects.create(title='Рассылка', body='Текст', slug='mailing', user=self.user)
+
+        self.assertEqual(len(self.get_emails(get_mailing_recipients(mailing))), 3)
+        mailing.segment = self.segment
+        self.assertEqual(self.get_emails(get_mailing_recipients(mailing)), ['eve@mail.com'])
+
+    def test_switch_from_rule_to_empty_list_clears_members(self) -> None:
+        set_segment_clients(self.segment, ['eve@mail.com'])
+        self.update(rule_field='email', rule_lookup='icontains', rule_value='corp')
+        self.assertEqual(self.segment.clients.count(), 0)
+
+        self.update()
+
+        self.assertFalse(self.segment.is_rule_based)
+        self.assertEqual(self.get_emails(get_segment_clients(self.segment)), [])
+
+    def test_renaming_static_segment_keeps_members(self) -> None:
+        set_segment_clients(self.segment, ['eve@mail.com'])
+
+        self.update(name='Новое название')
+
+        self.assertEqual(self.segment.name, 'Новое название')
+        self.assertEqual(self.get_emails(get_segment_clients(self.segment)), ['eve@mail.com'])
+
+    @override_settings(CACHE_ENABLED=True, CACHES=LOCMEM_CACHES)
+    def test_segment_size_is_cached_per_segment_until_clients_change(self) -> None:
+        cache.clear()
+        other = Segment.objects.create(name='Правило', user=self.user, rule_field='email', rule_lookup='iendswith',
+                                       rule_value='@corp.com')
+        set_segment_clients(self.segment, ['eve@mail.com'])
+        sizes = (get_segment_size(self.segment), get_segment_size(other))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual((get_segment_size(self.segment), get_segment_size(other)), sizes)
+
+        Client.objects.create(email='cid@corp.com', fullname='Сид', user=self.user)
+
+        self.assertEqual(sizes, (1, 2))
+        self.assertEqual(len(queries.captured_queries), 0)
+        self.assertEqual((get_segment_size(self.segment), get_segment_size(other)), (1, 3))
+
+
+@override_settings(CACHE_ENABLED=True, CACHES=LOCMEM_CACHES)
+class VersionedCacheTestCase(TestCase):
+    '''
+    Тесты кэша с версией: сброс значений увеличением версии, получение новой
+    версии другими процессами и защита от одновременного пересчета
+    '''
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.loader = mock.Mock(side_effect=['первое', 'второе'])
+
+    def get_cache(self) -> VersionedCache:
+        # отдельный экземпляр без записей в памяти процесса - как в другом процессе
+        return VersionedCache('tests', 60, local_ttl=0)
+
+    def expire(self, versioned_cache: VersionedCache, key: str, value: str) -> str:
+        full_key = f'{versioned_cache.name}:{versioned_cache.get_version()}:{key}'
+        cache.set(full_key, (value, 0.0, time.time() - 1))
+
+        return full_key
+
+    def test_value_is_loaded_once_until_bump(self) -> None:
+        versioned_cache = self.get_cache()
+
+        self.assertEqual(versioned_cache.get_or_set('key', self.loader), 'первое')
+        self.assertEqual(self.get_cache().get_or_set('key', self.loader), 'первое')
+        self.assertEqual(self.loader.call_count, 1)
+
+        versioned_cache.bump()
+
+        self.assertEqual(self.get_cache().get_or_set('key', self.loader), 'второе')
+        self.assertEqual(self.loader.call_count, 2)
+
+    def test_bump_reaches_other_processes_through_shared_cache(self) -> None:
+        versioned_cache = VersionedCache('tests', 60, local_ttl=60)
+        other = self.get_cache()
+        version = versioned_cache.get_version()
+
+        other.bump()
+
+        self.assertEqual(versioned_cache.get_version(), version)
+        self.assertGreater(other.get_version(), version)
+        self.assertEqual(self.get_cache().get_version(), other.get_version())
+
+    @override_settings(CACHE_ENABLED=False)
+    def test_bump_without_shared_cache_resets_process_values(self) -> None:
+        versioned_cache = VersionedCache('tests', 60)
+
+        self.assertEqual(versioned_cache.get_or_set('key', self.loader), 'первое')
+        versioned_cache.bump()
+
+        self.assertEqual(versioned_cache.get_or_set('key', self.loader), 'второе')
+
+    def test_expired_value_is_served_while_other_process_refreshes(self) -> None:
+        versioned_cache = self.get_cache()
+        full_key = self.expire(versioned_cache, 'key', 'старое')
+        cache.add(f'{full_key}:lock', 1)
+
+        with mock.patch('mailings.cache.time.sleep') as sleep:
+            self.assertEqual(versioned_cache.get_or_set('key', self.loader), 'старое')
+
+        sleep.assert_not_called()
+        self.loader.assert_not_called()
+
+        cache.delete(f'{full_key}:lock')
+
+        self.assertEqual(versioned_cache.get_or_set('key', self.loader), 'первое')
+        self.assertEqual(cache.get(full_key)[0], 'первое')
+        self.assertIsNone(cache.get(f'{full_key}:lock'))
+
+    def test_missing_value_is_awaited_from_other_process(self) -> None:
+        versioned_cache = self.get_cache()
+        full_key = f'tests:{versioned_cache.get_version()}:key'
+        cache.add(f'{full_key}:lock', 1)
+
+        def compute_in_other_process(seconds: float) -> None:
+            cache.set(full_key, ('от другого процесса', 0.0, time.time() + 60))
+
+        with mock.patch('mailings.cache.time.sleep', side_effect=compute_in_other_process):
+            self.assertEqual(versioned_cache.get_or_set('key', self.loader), 'от другого процесса')
+
+        self.loader.assert_not_called()
+
+
+@override_settings(CACHE_ENABLED=True, CACHES=LOCMEM_CACHES)
+class ClientListTestCase(TestCase):
+    '''
+    Тесты списка клиентов: постраничный вывод по ключу и чтение страницы
+    только при промахе кэша фрагмента
+    '''
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create(email='owner@example.com')
+        cls.user.user_permissions.add(Permission.objects.get(codename='view_client'))
+        Client.objects.bulk_create([
+            Client(email='ann@corp.com', fullname='Анна', user=cls.user),
+            Client(email='bob@corp.com', fullname='Борис', user=cls.user),
+            Client(email='eve@mail.com', fullname='Ева', user=cls.user),
+        ])
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def get_page(self, cursor: str = None) -> tuple[list[str], str | None]:
+        response = self.client.get(reverse('mailings:client_list'), {'cursor': cursor} if cursor else {})
+        context = response.context
+
+        next_cursor = context['next_cursor']
+
+        return [client.email for client in context['object_list']], str(next_cursor) if next_cursor else None
+
+    @mock.patch.object(ClientListView, 'per_page', 2)
+    def test_pages_follow_cursor(self) -> None:
+        emails, cursor = self.get_page()
+        self.assertEqual(emails, ['ann@corp.com', 'bob@corp.com'])
+
+        self.assertEqual(self.get_page(cursor), (['eve@mail.com'], None))
+
+    def test_cached_fragment_does_not_read_page(self) -> None:
+        url = reverse('mailings:client_list')
+
+        with mock.patch('mailings.views.get_keyset_page', side_effect=get_keyset_page) as read_page:
+            self.client.get(url)
+            response = self.client.get(url)
+
+        self.assertEqual(read_page.call_count, 1)
+        self.assertContains(response, 'eve@mail.com')
@@ -1,12 +1,12 @@
 from django.urls import path
-from django.views.decorators.cache import cache_page
 
 from mailings.apps import MailingsConfig
 from mailings.views import (
     IndexView, MailingListView, MailingDetailView, MailingCreateView,
     MailingUpdateView, MailingDeleteView, ChangeMailingStatusView, ClientListView,
-    ClientDetailView, ClientCreateView, ClientUpdateView, ClientDeleteView,
-    MailingLogsListView, ManagerMailingListView
+    ClientDetailView, ClientCreateView, ClientUpdateView, ClientDeleteView, ClientImportView,
+    ClientExportView, DeliveryExportView, MailingLogsListView, ManagerMailingListView, SegmentListView,
+    SegmentDetailView, SegmentCreateView, SegmentUpdateView, SegmentDeleteView
 )
 
 app_name = MailingsConfig.name
@@ -20,10 +20,18 @@ urlpatterns = [
     path('mailing_delete/<slug:slug>/', MailingDeleteView.as_view(), name='mailing_delete'),
     path('status_change/<slug:slug>/', ChangeMailingStatusView.as_view(), name='mailing_status'),
     path('clients/', ClientListView.as_view(), name='client_list'),
-    path('clients/<int:pk>/', cache_page(900)(ClientDetailView.as_view()), name='client_detail'),
+    path('clients/<int:pk>/', ClientDetailView.as_view(), name='client_detail'),
     path('client_create/', ClientCreateView.as_view(), name='client_create'),
     path('client_update/<int:pk>/', ClientUpdateView.as_view(), name='client_update'),
     path('client_delete/<int:pk>/', ClientDeleteView.as_view(), name='client_delete'),
+    path('client_import/', ClientImportView.as_view(), name='client_import'),
+    path('client_export/', ClientExportView.as_view(), name='client_export'),
+    path('segments/', SegmentListView.as_view(), name='segment_list'),
+    path('segments/<int:pk>/', SegmentDetailView.as_view(), name='segment_detail'),
+    path('segment_create/', SegmentCreateView.as_view(), name='segment_create'),
+    path('segment_update/<int:pk>/', SegmentUpdateView.as_view(), name='segment_update'),
+    path('segment_delete/<int:pk>/', SegmentDeleteView.as_view(), name='segment_delete'),
     path('mailing_logs/', MailingLogsListView.as_view(), name='mailing_logs_list'),
+    path('delivery_export/', DeliveryExportView.as_view(), name='delivery_export'),
     path('manager_mailing/', ManagerMailingListView.as_view(), name='manager_mailing_list'),
 ]
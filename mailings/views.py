@@ -1,26 +1,47 @@
-import random
+from blog.services import get_random_articles
 
 from django.contrib.auth.mixins import (
     LoginRequiredMixin, PermissionRequiredMixin, UserPassesTestMixin
 )
-from django.db.models import Q, QuerySet
-from django.http import HttpResponse
+from django.db.models import ProtectedError, Q, QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
 from django.views import View
 from django.views.generic import (
-    CreateView, DeleteView, DetailView, ListView, TemplateView, UpdateView
+    CreateView, DeleteView, DetailView, FormView, ListView, TemplateView, UpdateView
 )
 
-from typing import Any
+import io
+import re
+
+from typing import Any, Callable, Iterator
 
 from pytils.translit import slugify
 
-from mailings.forms import ClientForm, MailingForm
-from mailings.models import Client, Mailing, MailingLogs, MailingStatus
-from mailings.services import (
-    check_mailing_status, check_user, get_articles_from_cache, get_status_object
+from mailings.forms import ClientForm, ClientImportForm, MailingForm, MailingLogsFilterForm, SegmentForm
+from mailings.mixins import (
+    ClientAccessMixin, DetailCacheMixin, ListCacheMixin, MailingAccessMixin, SegmentAccessMixin
+)
+from mailings.models import Client, Mailing, MailingLogs, Segment
+from mailings.services.access import check_user
+from mailings.services.dispatch import change_mailings_status
+from mailings.services.exports import get_clients_export, get_deliveries_export, iter_export_bytes, iter_export_lines
+from mailings.services.imports import import_clients
+from mailings.services.logs import get_mailing_logs_summary
+from mailings.services.lookups import (
+    STATUS_CREATED, STATUS_FINISHED, STATUS_RUNNING, check_mailing_status, get_status_object
 )
+from mailings.services.segments import get_segment_clients, get_segment_size, set_segment_clients
+from mailings.services.stats import get_index_stats
+from mailings.services.utils import get_keyset_page
+from mailings.services.versions import LIST_SCOPE_ALL
+
+from users.models import User
+
+ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
 
 
 class IndexView(TemplateView):
@@ -32,18 +53,15 @@ class IndexView(TemplateView):
     def get_context_data(self, **kwargs) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
         context['title'] = 'Главная страница'
-        context['total_mailings'] = len(Mailing.objects.all())
-        context['active_mailings'] = len(Mailing.objects.exclude(status=get_status_object('завершена')))
-        context['unique_clients'] = len(Client.objects.values('email').distinct())
-        try:
-            context['blog_articles'] = random.sample(list(get_articles_from_cache()), 3)
-        except ValueError:
-            context['blog_articles'] = []
+        context.update(get_index_stats())
+        context['blog_articles'] = get_random_articles(3)
 
         return context
 
 
-class MailingListView(LoginRequiredMixin, UserPassesTestMixin, PermissionRequiredMixin, ListView):
+class MailingListView(
+    LoginRequiredMixin, UserPassesTestMixin, PermissionRequiredMixin, ListCacheMixin, ListView
+):
     '''
     Класс отображения страницы со всеми рассылками
     '''
@@ -52,7 +70,7 @@ class MailingListView(LoginRequiredMixin, UserPassesTestMixin, PermissionRequire
 
     def get_queryset(self, *args, **kwargs) -> QuerySet:
         queryset = super().get_queryset(*args, **kwargs)
-        queryset = queryset.filter(user=self.request.user)
+        queryset = queryset.filter(user=self.request.user).select_related('status', 'regularity')
 
         return queryset
 
@@ -63,28 +81,28 @@ class MailingListView(LoginRequiredMixin, UserPassesTestMixin, PermissionRequire
         return context
 
     def test_func(self) -> bool:
-        return self.request.user.groups.filter(name='service_users')
+        return 'service_users' in self.request.user_groups
 
 
-class MailingDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
+class MailingDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailCacheMixin, MailingAccessMixin, DetailView):
     '''
     Класс для отображения информации об одной рассылке
     '''
     model = Mailing
     permission_required = 'mailings.view_mailing'
 
-    def dispatch(self, request, *args, **kwargs) -> HttpResponse:
-        group = self.request.user.groups.filter(name='manager')
-        status = self.get_object().status
+    def get_queryset(self):
+        # ключ кэша фрагмента содержит сегмент и владельца рассылки, они загружаются одним запросом с ней
+        return super().get_queryset().select_related('segment', 'user')
 
-        if not group:
-            if not check_user(self.get_object().user, self.request.user):
-                return redirect('mailings:mailing_list')
-        else:
-            if status == get_status_object('завершена'):
-                return redirect('mailings:manager_mailing_list')
+    def get_denied_url(self, mailing: Mailing) -> str | None:
+        if not self.is_manager:
+            return super().get_denied_url(mailing)
 
-        return super().dispatch(request, *args, **kwargs)
+        if check_mailing_status(mailing, STATUS_FINISHED):
+            return 'mailings:manager_mailing_list'
+
+        return None
 
     def get_context_data(self, **kwargs) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
@@ -102,10 +120,16 @@ class MailingCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView)
     permission_required = 'mailings.add_mailing'
     success_url = reverse_lazy('mailings:mailing_list')
 
+    def get_form_kwargs(self) -> dict[str, Any]:
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+
+        return kwargs
+
     def form_valid(self, form) -> HttpResponse:
         if form.is_valid():
             self.object = form.save()
-            self.object.status = MailingStatus.objects.get(name='создана')
+            self.object.status = get_status_object(STATUS_CREATED)
             self.object.slug = slugify(f'{self.object.title}-{self.object.pk}')
             self.object.user = self.request.user
             self.object.save()
@@ -119,7 +143,7 @@ class MailingCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView)
         return context
 
 
-class MailingUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
+class MailingUpdateView(LoginRequiredMixin, PermissionRequiredMixin, MailingAccessMixin, UpdateView):
     '''
     Класс для редактирования рассылки
     '''
@@ -128,13 +152,17 @@ class MailingUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView)
     permission_required = 'mailings.change_mailing'
     success_url = reverse_lazy('mailings:mailing_list')
 
-    def dispatch(self, request, *args, **kwargs) -> HttpResponse:
-        mailing = self.get_object()
+    def get_denied_url(self, mailing: Mailing) -> str | None:
+        if not self.is_owner(mailing) or not check_mailing_status(mailing, STATUS_CREATED):
+            return self.denied_url
 
-        if not check_user(mailing.user, self.request.user) or not check_mailing_status(mailing, 'создана'):
-            return redirect('mailings:mailing_list')
+        return None
 
-        return super().dispatch(request, *args, **kwargs)
+    def get_form_kwargs(self) -> dict[str, Any]:
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+
+        return kwargs
 
     def form_valid(self, form) -> HttpResponse:
         if form.is_valid():
@@ -151,29 +179,24 @@ class MailingUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView)
         return context
 
 
-class MailingDeleteView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView):
+class MailingDeleteView(LoginRequiredMixin, PermissionRequiredMixin, MailingAccessMixin, DeleteView):
     '''
     Класс для удаления рассылки
     '''
     model = Mailing
     permission_required = 'mailings.delete_mailing'
 
-    def dispatch(self, request, *args, **kwargs) -> HttpResponse:
-        mailing = self.get_object()
-        group = self.request.user.groups.filter(name='manager')
-
-        if not group:
-            if not check_user(mailing.user, self.request.user) or check_mailing_status(mailing, 'запущена'):
-                return redirect('mailings:mailing_list')
-        elif self.get_object().status != get_status_object('создана'):
-            return redirect('mailings:manager_mailing_list')
+    def get_denied_url(self, mailing: Mailing) -> str | None:
+        if not self.is_manager:
+            if not self.is_owner(mailing) or check_mailing_status(mailing, STATUS_RUNNING):
+                return self.denied_url
+        elif not check_mailing_status(mailing, STATUS_CREATED):
+            return 'mailings:manager_mailing_list'
 
-        return super().dispatch(request, *args, **kwargs)
+        return None
 
     def get_success_url(self) -> str:
-        group = self.request.user.groups.filter(name='manager')
-
-        if group:
+        if self.is_manager:
             return reverse('mailings:manager_mailing_list')
 
         return reverse('mailings:mailing_list')
@@ -198,12 +221,12 @@ class ChangeMailingStatusView(LoginRequiredMixin, PermissionRequiredMixin, View)
 
     def get(self, request, slug) -> HttpResponse:
         mailing = self.__get_mailing(slug)
-        group = self.request.user.groups.filter(name='manager')
+        group = 'manager' in self.request.user_groups
 
         if not group:
-            if not check_user(mailing.user, self.request.user) or not check_mailing_status(mailing, 'запущена'):
+            if not check_user(mailing.user, self.request.user) or not check_mailing_status(mailing, STATUS_RUNNING):
                 return redirect('mailings:mailing_list')
-        elif not check_mailing_status(mailing, 'запущена'):
+        elif not check_mailing_status(mailing, STATUS_RUNNING):
             return redirect('mailings:manager_mailing_list')
 
         return render(
@@ -213,10 +236,9 @@ class ChangeMailingStatusView(LoginRequiredMixin, PermissionRequiredMixin, View)
 
     def post(self, request, slug) -> HttpResponse:
         mailing = self.__get_mailing(slug)
-        mailing.status = MailingStatus.objects.get(name='завершена')
-        mailing.save()
+        change_mailings_status(Mailing.objects.filter(pk=mailing.pk), STATUS_FINISHED, initiator=request.user)
 
-        group = self.request.user.groups.filter(name='manager')
+        group = 'manager' in self.request.user_groups
 
         if group:
             return redirect('mailings:manager_mailing_list')
@@ -224,40 +246,49 @@ class ChangeMailingStatusView(LoginRequiredMixin, PermissionRequiredMixin, View)
         return redirect('mailings:mailing_list')
 
 
-class ClientListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+class ClientListView(LoginRequiredMixin, PermissionRequiredMixin, ListCacheMixin, ListView):
     '''
-    Класс для отображения всех клиентов
+    Класс для отображения всех клиентов. Клиенты выводятся постранично
+    с пагинацией по ключу (email, id) и ищутся по началу e-mail или ФИО
     '''
     model = Client
     permission_required = 'mailings.view_client'
+    context_object_name = 'clients'
+    per_page = 48
 
     def get_queryset(self, *args, **kwargs) -> QuerySet:
         queryset = super().get_queryset(*args, **kwargs)
         user = self.request.user
-        queryset = queryset.filter(user=user)
+        queryset = queryset.filter(user=user).only('pk', 'email', 'fullname')
+        self.search = self.request.GET.get('q', '').strip()
+
+        if self.search:
+            queryset = queryset.filter(Q(email__istartswith=self.search) | Q(fullname__istartswith=self.search))
 
         return queryset
 
-    def get_context_data(self, **kwargs) -> dict[str, Any]:
-        context = super().get_context_data(**kwargs)
+    def get_context_data(self, *, object_list=None, **kwargs) -> dict[str, Any]:
+        # страница читается при первом обращении из фрагмента {% cache %}, то есть только при промахе кэша
+        page = SimpleLazyObject(lambda: get_keyset_page(
+            self.object_list, ('email', 'id'), self.request.GET.get('cursor'), self.per_page
+        ))
+
+        context = super().get_context_data(object_list=SimpleLazyObject(lambda: page[0]), **kwargs)
         context['title'] = 'Клиенты'
+        context['search'] = self.search
+        context['next_cursor'] = SimpleLazyObject(lambda: page[1])
+        context['is_first_page'] = not self.request.GET.get('cursor')
 
         return context
 
 
-class ClientDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
+class ClientDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailCacheMixin, ClientAccessMixin, DetailView):
     '''
     Класс для отображения одного клиента
     '''
     model = Client
     permission_required = 'mailings.view_client'
 
-    def dispatch(self, request, *args, **kwargs) -> HttpResponse:
-        if not check_user(self.get_object().user, self.request.user):
-            return redirect('mailings:client_list')
-
-        return super().dispatch(request, *args, **kwargs)
-
     def get_context_data(self, **kwargs) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
         context['title'] = self.object.fullname
@@ -295,7 +326,7 @@ class ClientCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
         return context
 
 
-class ClientUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
+class ClientUpdateView(LoginRequiredMixin, PermissionRequiredMixin, ClientAccessMixin, UpdateView):
     '''
     Класс для обновления клиента
     '''
@@ -304,12 +335,6 @@ class ClientUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
     permission_required = 'mailings.change_client'
     success_url = reverse_lazy('mailings:client_list')
 
-    def dispatch(self, request, *args, **kwargs) -> HttpResponse:
-        if not check_user(self.get_object().user, self.request.user):
-            return redirect('mailings:client_list')
-
-        return super().dispatch(request, *args, **kwargs)
-
     def get_form_kwargs(self) -> dict[str, Any]:
         kwargs = super().get_form_kwargs()
         kwargs.update({'user': self.request.user, 'email': self.object.email})
@@ -323,7 +348,7 @@ class ClientUpdateView(LoginRequiredMixin, PermissionRequiredMixin, UpdateView):
         return context
 
 
-class ClientDeleteView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView):
+class ClientDeleteView(LoginRequiredMixin, PermissionRequiredMixin, ClientAccessMixin, DeleteView):
     '''
     Класс для удаления клиента
     '''
@@ -331,36 +356,251 @@ class ClientDeleteView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView):
     permission_required = 'mailings.delete_client'
     success_url = reverse_lazy('mailings:client_list')
 
-    def dispatch(self, request, *args, **kwargs) -> HttpResponse:
-        if not check_user(self.get_object().user, self.request.user):
-            return redirect('mailings:client_list')
+    def get_context_data(self, **kwargs) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context['title'] = f'Удаление клиента {self.object.fullname}'
+
+        return context
+
+
+class SegmentListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
+    '''
+    Класс для отображения сегментов клиентов пользователя
+    '''
+    model = Segment
+    permission_required = 'mailings.view_client'
+
+    def get_queryset(self, *args, **kwargs) -> QuerySet:
+        queryset = super().get_queryset(*args, **kwargs)
 
-        return super().dispatch(request, *args, **kwargs)
+        return queryset.filter(user=self.request.user).order_by('name')
 
     def get_context_data(self, **kwargs) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
-        context['title'] = f'Удаление клиента {self.object.fullname}'
+        context['title'] = 'Сегменты'
+
+        for segment in context['object_list']:
+            segment.size = get_segment_size(segment)
+
+        return context
+
+
+class SegmentDetailView(LoginRequiredMixin, PermissionRequiredMixin, SegmentAccessMixin, DetailView):
+    '''
+    Класс для отображения сегмента и его клиентов постранично
+    '''
+    model = Segment
+    permission_required = 'mailings.view_client'
+    per_page = 50
+
+    def get_context_data(self, **kwargs) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        clients, next_cursor = get_keyset_page(
+            get_segment_clients(self.object).only('pk', 'email', 'fullname'), ('email', 'id'),
+            self.request.GET.get('cursor'), self.per_page
+        )
+        context['title'] = self.object.name
+        context['size'] = get_segment_size(self.object)
+        context['clients'] = clients
+        context['next_cursor'] = next_cursor
+        context['is_first_page'] = not self.request.GET.get('cursor')
 
         return context
 
 
+class SegmentCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
+    '''
+    Класс для создания сегмента клиентов
+    '''
+    model = Segment
+    form_class = SegmentForm
+    permission_required = 'mailings.add_client'
+
+    def form_valid(self, form) -> HttpResponse:
+        self.object = form.save(commit=False)
+        self.object.user = self.request.user
+        self.object.save()
+
+        if not self.object.is_rule_based:
+            set_segment_clients(self.object, form.get_emails())
+
+        return redirect(self.get_success_url())
+
+    def get_success_url(self) -> str:
+        return reverse('mailings:segment_detail', args=[self.object.pk])
+
+    def get_context_data(self, **kwargs) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context['title'] = 'Создание сегмента'
+
+        return context
+
+
+class SegmentUpdateView(LoginRequiredMixin, PermissionRequiredMixin, SegmentAccessMixin, UpdateView):
+    '''
+    Класс для редактирования сегмента клиентов
+    '''
+    model = Segment
+    form_class = SegmentForm
+    permission_required = 'mailings.change_client'
+
+    def form_valid(self, form) -> HttpResponse:
+        self.object = form.save()
+        emails = form.get_emails()
+
+        if self.object.is_rule_based:
+            # статический список правилом не используется и не должен вернуться при отмене правила
+            self.object.clients.clear()
+        elif emails or 'rule_field' in form.changed_data:
+            # при переходе с правила на список в сегменте остаются только указанные клиенты
+            set_segment_clients(self.object, emails)
+
+        return redirect(self.get_success_url())
+
+    def get_success_url(self) -> str:
+        return reverse('mailings:segment_detail', args=[self.object.pk])
+
+    def get_context_data(self, **kwargs) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context['title'] = f'Редактирование сегмента {self.object.name}'
+
+        return context
+
+
+class SegmentDeleteView(LoginRequiredMixin, PermissionRequiredMixin, SegmentAccessMixin, DeleteView):
+    '''
+    Класс для удаления сегмента клиентов. Сегмент, выбранный в
+    рассылках, не удаляется, чтобы рассылка не ушла всем клиентам
+    '''
+    model = Segment
+    permission_required = 'mailings.delete_client'
+    success_url = reverse_lazy('mailings:segment_list')
+
+    def form_valid(self, form) -> HttpResponse:
+        try:
+            return super().form_valid(form)
+        except ProtectedError:
+            return self.render_to_response(self.get_context_data(
+                error='Сегмент используется в рассылках, сначала выберите для них другой сегмент'
+            ))
+
+    def get_context_data(self, **kwargs) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context['title'] = f'Удаление сегмента {self.object.name}'
+
+        return context
+
+
+class ClientImportView(LoginRequiredMixin, PermissionRequiredMixin, FormView):
+    '''
+    Класс для импорта клиентов из CSV или JSONL файла. Файл читается
+    построчно, клиенты сохраняются порциями
+    '''
+    form_class = ClientImportForm
+    permission_required = 'mailings.add_client'
+    template_name = 'mailings/client_import.html'
+
+    def form_valid(self, form) -> HttpResponse:
+        file = form.cleaned_data['file']
+        # загруженный файл остается на диске или в памяти Django, строки декодируются по мере чтения
+        lines = io.TextIOWrapper(file.file, encoding='utf-8-sig', errors='replace', newline='')
+        report = import_clients(self.request.user, lines, form.file_format)
+
+        return self.render_to_response(self.get_context_data(form=ClientImportForm(), report=report))
+
+    def get_context_data(self, **kwargs) -> dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context['title'] = 'Импорт клиентов'
+
+        return context
+
+
+class ExportView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    '''
+    Класс потоковой выгрузки в CSV или JSONL (?format=jsonl). Строки
+    выгрузки возвращает функция export_source(user) - пара (имена колонок,
+    генератор строк). Строки читаются из базы данных порциями и сразу
+    отправляются клиенту, если клиент принимает gzip - выгрузка сжимается
+    '''
+    filename = 'export'
+    content_types = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+    export_source: Callable[[User], tuple[tuple[str, ...], Iterator[tuple]]] = None
+
+    def get(self, request) -> HttpResponse:
+        file_format = request.GET.get('format', 'csv')
+
+        if file_format not in self.content_types:
+            file_format = 'csv'
+
+        compress = bool(ACCEPTS_GZIP_RE.search(request.headers.get('Accept-Encoding', '')))
+        fields, rows = self.export_source(request.user)
+        response = StreamingHttpResponse(
+            iter_export_bytes(iter_export_lines(fields, rows, file_format), compress),
+            content_type=f'{self.content_types[file_format]}; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}.{file_format}"'
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if compress:
+            response['Content-Encoding'] = 'gzip'
+
+        return response
+
+
+class ClientExportView(ExportView):
+    '''
+    Класс для выгрузки клиентов пользователя
+    '''
+    permission_required = 'mailings.view_client'
+    filename = 'clients'
+    export_source = staticmethod(get_clients_export)
+
+
+class DeliveryExportView(ExportView):
+    '''
+    Класс для выгрузки доставок рассылок пользователя
+    '''
+    permission_required = 'mailings.view_mailinglogs'
+    filename = 'deliveries'
+    export_source = staticmethod(get_deliveries_export)
+
+
 class MailingLogsListView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
     '''
-    Класс для просмотра всех логов рассылок
+    Класс для просмотра всех логов рассылок. Логи выводятся постранично
+    с пагинацией по ключу (attempt_datetime, id) и выбираются по списку
+    рассылок пользователя, чтобы запрос шел по индексу
+    (mailing, -attempt_datetime, -id), а не по всем логам сервиса
     '''
     model = MailingLogs
     permission_required = 'mailings.view_mailinglogs'
     template_name = 'mailings/mailing_logs_list.html'
+    per_page = 50
 
-    def get_queryset(self, *args, **kwargs) -> MailingLogs:
+    def get_queryset(self, *args, **kwargs) -> QuerySet:
         queryset = super().get_queryset(*args, **kwargs)
-        queryset = queryset.filter(mailing__user=self.request.user).order_by('-attempt_datetime')
+        mailing_pks = list(Mailing.objects.filter(user=self.request.user).values_list('pk', flat=True))
+        queryset = queryset.filter(mailing_id__in=mailing_pks).select_related('mailing').only(
+            'attempt_datetime', 'status', 'mailing__title', 'mailing__slug'
+        )
+        self.filter_form = MailingLogsFilterForm(self.request.GET or None, user=self.request.user)
 
-        return queryset
+        return self.filter_form.filter_queryset(queryset)
 
     def get_context_data(self, *, object_list=None, **kwargs) -> dict[str, Any]:
-        context = super().get_context_data(**kwargs)
+        logs, next_cursor = get_keyset_page(
+            self.object_list, ('-attempt_datetime', '-id'), self.request.GET.get('cursor'), self.per_page
+        )
+        query = self.request.GET.copy()
+        query.pop('cursor', None)
+
+        context = super().get_context_data(object_list=logs, **kwargs)
         context['title'] = 'Логи рассылок'
+        context['filter_form'] = self.filter_form
+        context['filter_query'] = query.urlencode()
+        context['next_cursor'] = next_cursor
+        context['is_first_page'] = not self.request.GET.get('cursor')
+        context['summary'] = get_mailing_logs_summary(self.request.user)
 
         return context
 
@@ -371,12 +611,12 @@ class ManagerMailingListView(MailingListView):
     '''
     template_name = 'mailings/manager_mailing_list.html'
     permission_required = 'mailings.view_mailing'
+    list_cache_scope = LIST_SCOPE_ALL
 
     def get_queryset(self, *args, **kwargs) -> QuerySet:
         queryset = Mailing.objects.filter(
-            Q(status=get_status_object('запущена')) |
-            Q(status=get_status_object('создана'))
-        )
+            status__in=[get_status_object(STATUS_RUNNING), get_status_object(STATUS_CREATED)]
+        ).select_related('regularity', 'user')
 
         return queryset
 
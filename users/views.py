@@ -6,6 +6,8 @@ from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMix
 from django.contrib.auth.models import Group
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.views import LoginView
+from django.db import transaction
+from django.db.models import QuerySet
 from django.http import HttpResponse
 from django.shortcuts import redirect, render, get_object_or_404
 from django.urls import reverse_lazy
@@ -14,8 +16,12 @@ from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.views import View
 from django.views.generic import CreateView, TemplateView, ListView, DetailView
 
-from mailings.models import Mailing
-from mailings.services import send_email, get_status_object
+from mailings.mixins import ListCacheMixin
+from mailings.services.dispatch import change_mailings_status
+from mailings.services.lookups import STATUS_FINISHED
+from mailings.services.sending import send_email
+from mailings.services.stats import annotate_mailing_counters
+from mailings.services.versions import LIST_SCOPE_ALL
 
 from typing import Any
 
@@ -202,12 +208,16 @@ class UserSentPassword(UserPassesTestMixin, TemplateView):
         return self.request.user.is_anonymous
 
 
-class UserListView(LoginRequiredMixin, PermissionRequiredMixin, UserPassesTestMixin, ListView):
+class UserListView(LoginRequiredMixin, PermissionRequiredMixin, UserPassesTestMixin, ListCacheMixin, ListView):
     '''
     Класс для просмотра всех пользователей сервиса
     '''
     model = User
     permission_required = 'users.view_user'
+    list_cache_scope = LIST_SCOPE_ALL
+
+    def get_queryset(self) -> QuerySet:
+        return annotate_mailing_counters(super().get_queryset()).order_by('pk')
 
     def get_context_data(self, **kwargs) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
@@ -226,14 +236,18 @@ class UserDetailView(LoginRequiredMixin, PermissionRequiredMixin, UserPassesTest
     model = User
     permission_required = 'users.view_user'
 
+    def get_queryset(self) -> QuerySet:
+        return annotate_mailing_counters(super().get_queryset())
+
     def get_context_data(self, **kwargs) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
         user = self.object
 
         context['title'] = f'{self.object.email}'
-        context['total_mailings'] = len(Mailing.objects.filter(user=user))
-        context['created_mailings'] = len(Mailing.objects.filter(user=user, status=get_status_object('создана')))
-        context['running_mailings'] = len(Mailing.objects.filter(user=user, status=get_status_object('запущена')))
+        context['total_mailings'] = user.total_mailings
+        context['created_mailings'] = user.created_mailings
+        context['running_mailings'] = user.running_mailings
+        context['finished_mailings'] = user.finished_mailings
         context['user'] = self.request.user
 
         return context
@@ -266,15 +280,14 @@ class UserChangeActive(LoginRequiredMixin, PermissionRequiredMixin, UserPassesTe
     def post(self, request, pk) -> HttpResponse:
         user = self.__get_user(pk)
 
-        if user.is_active:
-            user.is_active = False
-            for mailing in user.mailing_set.all():
-                mailing.status = get_status_object('завершена')
-                mailing.save()
-        else:
-            user.is_active = True
+        with transaction.atomic():
+            if user.is_active:
+                user.is_active = False
+                change_mailings_status(user.mailing_set.all(), STATUS_FINISHED, initiator=request.user)
+            else:
+                user.is_active = True
 
-        user.save()
+            user.save()
 
         return redirect('users:user_list')
 